@@ -1,22 +1,43 @@
-from fastapi import FastAPI, UploadFile, File, Form, Body
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, Body, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from research_agent import run_research_agent, ResearchRequest
+from jobs import job_manager
+from workspace import Workspace, SAVED_OUTPUT_FILE, LEGACY_PATHS
+from artifact_store import artifact_index, DEFAULT_PAGE_SIZE
+from brand_profiles import brand_registry
+import telemetry
 import os
 import json
+import asyncio
+import hashlib
+import uuid
+import shutil
 
 # Pydantic model for branding request
 class BrandingRequest(BaseModel):
     suggestion: str = ""
+    run_id: str = ""
+    auto_rewrite: bool = True
+    candidates: int = 0
+    brand_id: str = ""
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    await asyncio.to_thread(
+        artifact_index.backfill,
+        [os.path.join(base_dir, "agent_outputs"), os.path.join(base_dir, "outputs")],
+        LEGACY_PATHS.values(),
+    )
+    brand_registry.refresh(force=True)
+    job_manager.start()
+    yield
+    await job_manager.stop()
 
-brand_tone = """
-Warm, nurturing, informative
-Target audience: Indian parents
-No sales language
-SEO-friendly but human
-"""
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -27,6 +48,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# One span per HTTP request, labelled by route template (not the raw path) so
+# run and artifact ids do not explode the metric cardinality. For streaming
+# responses this covers the time until the stream starts.
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with telemetry.span("http_request", kind=request.method) as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        span.set(route=getattr(route, "path", "unmatched"), status=response.status_code)
+        return response
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(telemetry.render_metrics(), media_type=telemetry.PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/")
 async def health_check():
     return {"status": "ok", "message": "FastAPI backend running"}
@@ -52,13 +88,18 @@ async def research_agent_handler(
     brand: str = Form(default="Brand Authority Agent"),
     region: str = Form(...),
     blog_count: int = Form(default=1),
+    topics: str = Form(default=""),
+    run_id: str = Form(default=""),
     file: UploadFile = File(None),
 ):
     try:
-        # Read file content if provided
+        # Hand the spooled upload stream to the agent instead of reading it
+        # into memory; only the pages needed for the brief get parsed.
         file_content = None
+        filename = None
         if file:
-            file_content = await file.read()
+            file_content = file.file
+            filename = file.filename
         
         # Create request object
         request_data = ResearchRequest(
@@ -68,10 +109,13 @@ async def research_agent_handler(
             brand=brand,
             region=region,
             blog_count=blog_count,
+            topics=[t for t in topics.splitlines() if t.strip()],
         )
         
         # Run the research agent
-        result = await run_research_agent(request_data, file_content)
+        result = await run_research_agent(
+            request_data, file_content, filename, run_id=run_id or None
+        )
         return result
         
     except Exception as e:
@@ -82,59 +126,82 @@ async def research_agent_handler(
             "message": str(e),
         }
 
+# Paginated, filterable listing of indexed artifacts (metadata only). Content
+# is fetched lazily per artifact; both responses support If-None-Match.
 @app.get("/article-output")
-async def get_article_output():
+async def get_article_output(
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = "",
+    type: str = "",
+    run_id: str = "",
+    min_score: float | None = None,
+):
     try:
-        output_dir = "agent_outputs"
-        if not os.path.exists(output_dir):
-            return {"articles": []}
-        
-        articles = []
-        for file in os.listdir(output_dir):
-            if file.endswith(".md"):
-                with open(os.path.join(output_dir, file), "r") as f:
-                    articles.append({
-                        "filename": file,
-                        "content": f.read(),
-                    })
-        return {"articles": articles}
+        query = f"{limit}|{cursor}|{type}|{run_id}|{min_score}"
+        etag = '"' + hashlib.sha256(
+            (artifact_index.listing_etag() + query).encode("utf-8")
+        ).hexdigest()[:32] + '"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        articles, next_cursor = artifact_index.list(
+            limit=limit,
+            cursor=cursor or None,
+            artifact_type=type or None,
+            run_id=run_id or None,
+            min_score=min_score,
+        )
+        return JSONResponse(
+            {"articles": articles, "next_cursor": next_cursor},
+            headers={"ETag": etag},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/article-output/{artifact_id}")
+async def get_article_content(artifact_id: str, request: Request):
+    artifact = artifact_index.get(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    etag = artifact["etag"]
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    artifact, content = await asyncio.to_thread(artifact_index.read_content, artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return JSONResponse(
+        {**artifact, "path": None, "content": content},
+        headers={"ETag": etag},
+    )
+
 @app.post("/writing-agent")
-async def writing_agent_endpoint(brief: str = Form(...)):
+async def writing_agent_endpoint(
+    brief: str = Form(...),
+    stream: bool = Form(default=False),
+    sections: bool = Form(default=False),
+    run_id: str = Form(default=""),
+):
+    if stream:
+        return stream_writing_agent(brief, run_id or None)
+    if sections:
+        return await sectioned_writing_agent(brief, run_id or None)
     try:
         # Import the writing agent if it exists, otherwise use a placeholder
         try:
-            from research_agent import call_gemini
-            import json
-            
-            prompt = f"""
-You are an expert content writer.
-
-Generate a comprehensive blog article based on the following research brief:
-
-{json.dumps(json.loads(brief) if isinstance(brief, str) else brief, indent=2)}
-
-Write a complete, SEO-optimized article with:
-1. Engaging introduction
-2. Detailed sections based on the structure provided
-3. Keyword optimization
-4. Compelling conclusion with CTA
-
-Return the article content."""
-            
-            response = call_gemini(
-                prompt=prompt,
-                system_role="Expert content writer",
-                temperature=0.7
-            )
-            
-            article_content = response.text
-            
+            from writing_agent import write_article_from_brief
+
+            workspace = Workspace(run_id or None)
+            article_content = await write_article_from_brief(brief, workspace)
+
             return {
                 "status": "success",
                 "message": "Article generated successfully",
+                "run_id": workspace.run_id,
                 "article": article_content,
             }
         except ImportError:
@@ -147,18 +214,87 @@ Return the article content."""
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# Sectioned mode: intro, one section per question keyword and conclusion are
+# written concurrently; single sections can then be regenerated by id.
+async def sectioned_writing_agent(brief, run_id=None):
+    from writing_agent import write_article_sections
+
+    try:
+        workspace = Workspace(run_id)
+        article, sections = await write_article_sections(brief, workspace)
+        return {
+            "status": "success",
+            "message": "Article generated successfully",
+            "run_id": workspace.run_id,
+            "article": article,
+            "sections": [{"id": s["id"], "title": s["title"]} for s in sections],
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.post("/writing-agent/sections/{section_id}")
+async def regenerate_section_endpoint(section_id: str, run_id: str = Form(...)):
+    from writing_agent import regenerate_section
+
+    try:
+        workspace = Workspace(run_id)
+        article, section = await regenerate_section(workspace, section_id)
+        return {
+            "status": "success",
+            "run_id": workspace.run_id,
+            "section": section,
+            "article": article,
+        }
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No sectioned article for this run")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Server-Sent Events: one "chunk" event per streamed piece of the article,
+# then a final "done" (or "error") event.
+def stream_writing_agent(brief, run_id=None):
+    from writing_agent import stream_article_from_brief
+
+    # A bad run_id must fail as a 400 before the stream is opened
+    try:
+        workspace = Workspace(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def event_stream():
+        yield f"event: run\ndata: {json.dumps({'run_id': workspace.run_id})}\n\n"
+        try:
+            async for chunk in stream_article_from_brief(brief, workspace):
+                yield f"event: chunk\ndata: {json.dumps({'text': chunk})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'status': 'success'})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'status': 'error', 'message': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Brand profiles available to the branding agent and the pipeline (brand_id)
+@app.get("/brands")
+async def list_brands():
+    return {"brands": brand_registry.list()}
+
+@app.get("/llm-cache")
+async def llm_cache_stats():
+    from llm_cache import llm_cache
+    return llm_cache.stats()
+
 @app.post("/save-output")
-async def save_output_endpoint(content: str = Form(...)):
+async def save_output_endpoint(content: str = Form(...), run_id: str = Form(default="")):
     try:
-        output_dir = "agent_outputs"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        filename = os.path.join(output_dir, "output.md")
-        with open(filename, "w") as f:
-            f.write(content)
-        
+        workspace = Workspace(run_id or None)
+        filename = await workspace.write_text_async(SAVED_OUTPUT_FILE, content)
+
         return {
             "status": "success",
+            "run_id": workspace.run_id,
             "message": f"Output saved to {filename}",
         }
     except Exception as e:
@@ -183,9 +319,15 @@ async def branding_agent_endpoint(request_data: BrandingRequest):
         suggestion = request_data.suggestion if request_data.suggestion else None
         print(f"🔍 Branding agent called with suggestion: {suggestion}")
         
-        result = await run_branding_agent(brand_tone=brand_tone,suggestion=suggestion)
+        result = await run_branding_agent(
+            brand=request_data.brand_id or None,
+            suggestion=suggestion,
+            run_id=request_data.run_id or None,
+            auto_rewrite=request_data.auto_rewrite,
+            candidates=request_data.candidates or None,
+        )
 
-        print(f"✅ Branding agent result: {result}")
+        print(f"✅ Branding agent {result.get('status')}: run {result.get('run_id')}, score {result.get('final_score')}")
         return result
     except Exception as e:
         import traceback
@@ -195,3 +337,271 @@ async def branding_agent_endpoint(request_data: BrandingRequest):
             "status": "error",
             "message": str(e),
         }
+
+# research → article → branding in one request. The brief and the article
+# stay in memory between stages; resume_from=article|branding picks up an
+# earlier run (run_id) from its saved artifacts.
+@app.post("/pipeline")
+async def pipeline_endpoint(
+    topic: str = Form(...),
+    target_audience: str = Form(...),
+    content_goal: str = Form(...),
+    brand: str = Form(default="Brand Authority Agent"),
+    region: str = Form(...),
+    suggestion: str = Form(default=""),
+    brand_suggestion: str = Form(default=""),
+    brand_id: str = Form(default=""),
+    sections: bool = Form(default=False),
+    resume_from: str = Form(default="research"),
+    run_id: str = Form(default=""),
+    file: UploadFile = File(None),
+):
+    from pipeline import run_pipeline
+
+    try:
+        request_data = ResearchRequest(
+            topic=topic,
+            target_audience=target_audience,
+            content_goal=content_goal,
+            brand=brand,
+            region=region,
+        )
+        return await run_pipeline(
+            request_data,
+            brand_id or None,
+            file.file if file else None,
+            file.filename if file else None,
+            suggestion=suggestion or None,
+            brand_suggestion=brand_suggestion or None,
+            sections=sections,
+            resume_from=resume_from,
+            run_id=run_id or None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"status": "error", "message": str(e)}
+
+# ================= BACKGROUND JOBS =================
+# Each pipeline can also run as a background job: submit returns a job ID
+# immediately, and clients poll /jobs/{id} or follow /jobs/{id}/events (SSE)
+# for per-stage progress. Results are stored, so reconnecting never re-runs.
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "uploads")
+
+# A job's upload must outlive the request, so it is copied to disk, in a
+# thread so a large file does not stall the event loop
+def copy_upload(source, path):
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(source, f)
+
+async def save_upload(file):
+    upload_path = os.path.join(UPLOAD_DIR, uuid.uuid4().hex)
+    await asyncio.to_thread(copy_upload, file.file, upload_path)
+    return upload_path
+
+async def research_job(params, progress):
+    upload_path = params.get("upload_path")
+    try:
+        return await run_research_agent(
+            ResearchRequest(**params["request"]),
+            upload_path,
+            params.get("filename"),
+            on_stage=progress,
+            run_id=params.get("run_id"),
+        )
+    finally:
+        if upload_path and os.path.exists(upload_path):
+            os.remove(upload_path)
+
+async def writing_job(params, progress):
+    from writing_agent import write_article_from_brief, write_article_sections
+
+    workspace = Workspace(params.get("run_id"))
+    await progress("article", "started")
+    if params.get("sections"):
+        async def on_section(section):
+            await progress(f"section_{section['id']}", "finished", title=section["title"])
+
+        article, _ = await write_article_sections(params["brief"], workspace, on_section)
+    else:
+        article = await write_article_from_brief(params["brief"], workspace)
+    await progress("article", "finished")
+    return {
+        "status": "success",
+        "message": "Article generated successfully",
+        "run_id": workspace.run_id,
+        "article": article,
+    }
+
+async def branding_job(params, progress):
+    from branding_agent import run_branding_agent
+
+    return await run_branding_agent(
+        brand=params.get("brand_id") or None,
+        suggestion=params.get("suggestion") or None,
+        on_stage=progress,
+        run_id=params.get("run_id"),
+        auto_rewrite=params.get("auto_rewrite", True),
+        candidates=params.get("candidates") or None,
+    )
+
+async def pipeline_job(params, progress):
+    from pipeline import run_pipeline
+
+    upload_path = params.get("upload_path")
+    try:
+        return await run_pipeline(
+            ResearchRequest(**params["request"]),
+            params.get("brand_id") or None,
+            upload_path,
+            params.get("filename"),
+            suggestion=params.get("suggestion") or None,
+            brand_suggestion=params.get("brand_suggestion") or None,
+            sections=params.get("sections", False),
+            resume_from=params.get("resume_from") or "research",
+            run_id=params.get("run_id"),
+            on_stage=progress,
+        )
+    finally:
+        if upload_path and os.path.exists(upload_path):
+            os.remove(upload_path)
+
+job_manager.register("research", research_job)
+job_manager.register("writing", writing_job)
+job_manager.register("branding", branding_job)
+job_manager.register("pipeline", pipeline_job)
+
+def job_summary(job):
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+    }
+
+@app.post("/jobs/research")
+async def submit_research_job(
+    topic: str = Form(...),
+    target_audience: str = Form(...),
+    content_goal: str = Form(...),
+    brand: str = Form(default="Brand Authority Agent"),
+    region: str = Form(...),
+    blog_count: int = Form(default=1),
+    topics: str = Form(default=""),
+    run_id: str = Form(default=""),
+    idempotency_key: str = Form(default=""),
+    file: UploadFile = File(None),
+):
+    request_data = ResearchRequest(
+        topic=topic,
+        target_audience=target_audience,
+        content_goal=content_goal,
+        brand=brand,
+        region=region,
+        blog_count=blog_count,
+        topics=[t for t in topics.splitlines() if t.strip()],
+    )
+    params = {"request": request_data.model_dump(), "run_id": run_id or None}
+
+    if file:
+        params["upload_path"] = await save_upload(file)
+        params["filename"] = file.filename
+
+    job = await job_manager.submit("research", params, idempotency_key or None)
+    return job_summary(job)
+
+@app.post("/jobs/writing")
+async def submit_writing_job(
+    brief: str = Form(...),
+    sections: bool = Form(default=False),
+    run_id: str = Form(default=""),
+    idempotency_key: str = Form(default=""),
+):
+    job = await job_manager.submit(
+        "writing",
+        {"brief": brief, "sections": sections, "run_id": run_id or None},
+        idempotency_key or None,
+    )
+    return job_summary(job)
+
+@app.post("/jobs/branding")
+async def submit_branding_job(request_data: BrandingRequest, idempotency_key: str = ""):
+    job = await job_manager.submit(
+        "branding",
+        {
+            "suggestion": request_data.suggestion,
+            "run_id": request_data.run_id or None,
+            "auto_rewrite": request_data.auto_rewrite,
+            "candidates": request_data.candidates,
+            "brand_id": request_data.brand_id,
+        },
+        idempotency_key or None,
+    )
+    return job_summary(job)
+
+@app.post("/jobs/pipeline")
+async def submit_pipeline_job(
+    topic: str = Form(...),
+    target_audience: str = Form(...),
+    content_goal: str = Form(...),
+    brand: str = Form(default="Brand Authority Agent"),
+    region: str = Form(...),
+    suggestion: str = Form(default=""),
+    brand_suggestion: str = Form(default=""),
+    brand_id: str = Form(default=""),
+    sections: bool = Form(default=False),
+    resume_from: str = Form(default="research"),
+    run_id: str = Form(default=""),
+    idempotency_key: str = Form(default=""),
+    file: UploadFile = File(None),
+):
+    request_data = ResearchRequest(
+        topic=topic,
+        target_audience=target_audience,
+        content_goal=content_goal,
+        brand=brand,
+        region=region,
+    )
+    params = {
+        "request": request_data.model_dump(),
+        "suggestion": suggestion,
+        "brand_suggestion": brand_suggestion,
+        "brand_id": brand_id,
+        "sections": sections,
+        "resume_from": resume_from,
+        "run_id": run_id or None,
+    }
+
+    if file:
+        params["upload_path"] = await save_upload(file)
+        params["filename"] = file.filename
+
+    job = await job_manager.submit("pipeline", params, idempotency_key or None)
+    return job_summary(job)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        **job_summary(job),
+        "events": job["events"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    if job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async for event in job_manager.subscribe(job_id):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -1,6 +1,7 @@
 export async function GET(request) {
     try {
-        const res = await fetch("http://localhost:8001/article-output");
+        const { search } = new URL(request.url);
+        const res = await fetch(`http://localhost:8001/article-output${search}`);
         const data = await res.json();
         return Response.json(data);
     } catch (error) {
@@ -2,9 +2,18 @@ import { readFile } from "fs/promises";
 import { join } from "path";
 import { existsSync } from "fs";
 
+const RUN_ID_RE = /^[0-9a-f]{32}$/;
+
 export const GET = async (req) => {
     try {
-        const filePath = join(process.cwd(), "app", "agent_outputs", "research_briefs.json");
+        // ?run_id= reads that run's brief; without it, the shared latest file
+        const runId = new URL(req.url).searchParams.get("run_id");
+        if (runId && !RUN_ID_RE.test(runId)) {
+            return Response.json({ status: "error", message: "Invalid run_id" }, { status: 400 });
+        }
+        const filePath = runId
+            ? join(process.cwd(), "app", "runs", runId, "research_briefs.json")
+            : join(process.cwd(), "app", "agent_outputs", "research_briefs.json");
         
         if (!existsSync(filePath)) {
             return Response.json(
@@ -22,6 +31,7 @@ export const GET = async (req) => {
         
         return Response.json({
             status: "success",
+            run_id: runId,
             research_briefs: research_briefs,
         });
     } catch (error) {
@@ -47,6 +57,7 @@ export const POST = async (req) => {
         const brand = formData.get("brand") || "Brand Authority Agent";
         const region = formData.get("region");
         const blog_count = formData.get("blog_count") || "1";
+        const run_id = formData.get("run_id");
 
         // Create new FormData for backend
         const backendFormData = new FormData();
@@ -56,6 +67,9 @@ export const POST = async (req) => {
         backendFormData.append("brand", brand);
         backendFormData.append("region", region);
         backendFormData.append("blog_count", blog_count);
+        if (run_id) {
+            backendFormData.append("run_id", run_id);
+        }
 
         // Add file if present
         const file = formData.get("file");
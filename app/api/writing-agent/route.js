@@ -12,6 +12,10 @@ export async function POST(request) {
 
         const backendFormData = new FormData();
         backendFormData.append("brief", brief);
+        const runId = formData.get("run_id");
+        if (runId) {
+            backendFormData.append("run_id", runId);
+        }
 
         const res = await fetch("http://localhost:8001/writing-agent", {
             method: "POST",
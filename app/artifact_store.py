@@ -0,0 +1,220 @@
+import os
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+
+# ================= CONFIG =================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ARTIFACT_DB_PATH = os.getenv(
+    "ARTIFACT_DB_PATH",
+    os.path.join(BASE_DIR, "cache", "artifacts.sqlite3")
+)
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Workspace file name → artifact type
+ARTIFACT_TYPES = {
+    "research_briefs.json": "research",
+    "article.md": "article",
+    "article_branded.md": "branded_article",
+    "output.md": "output",
+    "article_sections.json": "article_sections",
+}
+
+def content_etag(text):
+    return '"' + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32] + '"'
+
+# ================= SQLITE INDEX =================
+# Metadata only: listing never touches the artifact files, and content is
+# read lazily by id. One row per (run_id, name); rewriting an artifact in the
+# same run updates its row.
+class ArtifactIndex:
+    def __init__(self, path=ARTIFACT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    id TEXT PRIMARY KEY,
+                    run_id TEXT,
+                    name TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    path TEXT NOT NULL UNIQUE,
+                    size INTEGER NOT NULL,
+                    etag TEXT NOT NULL,
+                    score REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_artifacts_listing "
+                "ON artifacts (created_at DESC, id DESC)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_artifacts_run ON artifacts (run_id)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def record(self, path, text, run_id=None, name=None, score=None):
+        name = name or os.path.basename(path)
+        now = time.time()
+        etag = content_etag(text)
+        size = len(text.encode("utf-8"))
+
+        with self._lock:
+            conn = self._connect()
+            existing = conn.execute(
+                "SELECT id, created_at, score FROM artifacts WHERE path = ?",
+                (path,)
+            ).fetchone()
+
+            if existing:
+                conn.execute(
+                    "UPDATE artifacts SET size = ?, etag = ?, score = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (size, etag, score if score is not None else existing["score"], now, existing["id"])
+                )
+                artifact_id = existing["id"]
+            else:
+                artifact_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO artifacts "
+                    "(id, run_id, name, type, path, size, etag, score, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        artifact_id,
+                        run_id,
+                        name,
+                        ARTIFACT_TYPES.get(name, "other"),
+                        path,
+                        size,
+                        etag,
+                        score,
+                        now,
+                        now,
+                    )
+                )
+            conn.commit()
+        return artifact_id
+
+    def get(self, artifact_id):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM artifacts WHERE id = ?",
+                (artifact_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list(
+        self,
+        limit=DEFAULT_PAGE_SIZE,
+        cursor=None,
+        artifact_type=None,
+        run_id=None,
+        min_score=None,
+    ):
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = [], []
+
+        if artifact_type:
+            where.append("type = ?")
+            params.append(artifact_type)
+        if run_id:
+            where.append("run_id = ?")
+            params.append(run_id)
+        if min_score is not None:
+            where.append("score >= ?")
+            params.append(min_score)
+
+        # Keyset pagination: the cursor is the (created_at, id) of the last row
+        if cursor:
+            try:
+                created_at, last_id = cursor.split(":", 1)
+                created_at = float(created_at)
+            except ValueError:
+                raise ValueError(f"❌ Invalid cursor: {cursor}")
+            where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params.extend([created_at, created_at, last_id])
+
+        query = (
+            "SELECT id, run_id, name, type, size, etag, score, created_at, updated_at "
+            "FROM artifacts"
+        )
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = [dict(r) for r in self._connect().execute(query, params).fetchall()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created_at']!r}:{rows[-1]['id']}"
+        return rows, next_cursor
+
+    def listing_etag(self):
+        with self._lock:
+            count, latest = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(MAX(updated_at), 0) FROM artifacts"
+            ).fetchone()
+        return f'"{count}-{latest!r}"'
+
+    def read_content(self, artifact_id):
+        artifact = self.get(artifact_id)
+        if artifact is None:
+            return None, None
+        try:
+            with open(artifact["path"], "r", encoding="utf-8") as f:
+                return artifact, f.read()
+        except FileNotFoundError:
+            # The file was removed behind the index: drop the stale row
+            self.delete(artifact_id)
+            return None, None
+
+    def delete(self, artifact_id):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM artifacts WHERE id = ?", (artifact_id,))
+            conn.commit()
+
+    # ---------- legacy files ----------
+    # Index pre-workspace markdown outputs once so they show up in listings.
+    # The "latest" mirrors maintained by workspace.publish_latest are skipped:
+    # they change on every run and their content is already indexed per run.
+    def backfill(self, directories, skip_paths=()):
+        skip_paths = set(skip_paths)
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                if not name.endswith(".md") or not os.path.isfile(path):
+                    continue
+                if path in skip_paths:
+                    continue
+                with self._lock:
+                    known = self._connect().execute(
+                        "SELECT 1 FROM artifacts WHERE path = ?", (path,)
+                    ).fetchone()
+                if known:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    self.record(path, f.read(), name=name)
+
+artifact_index = ArtifactIndex()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""Offline load benchmark for the FastAPI app (stub LLM + stub SERP)"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+ENDPOINTS = ["research", "writing", "writing_sections", "branding", "artifacts"]
+
+# ================= ARGS / ENV =================
+# Every module reads its configuration at import time, so the environment is
+# fully set up before the app is imported. All state (runs, caches, indexes)
+# goes to a throwaway directory and nothing is published over the checked-in
+# outputs.
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the agents API without network access")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM base latency (s)")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="injected 429/5xx rate")
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0, help="truncated JSON reply rate")
+    parser.add_argument("--serp-latency", type=float, default=0.3, help="stub SerpAPI latency (s)")
+    parser.add_argument("--serp-failure-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="keep the LLM/SERP caches enabled")
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="event-loop probe interval (s)")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the agents' stdout")
+    return parser.parse_args()
+
+def configure_env(args, workdir):
+    cache_flag = "1" if args.cache else "0"
+    os.environ.update({
+        "LLM_MODE": "stub",
+        "SERP_MODE": "stub",
+        "PUBLISH_LATEST": "0",
+        "RUNS_DIR": os.path.join(workdir, "runs"),
+        "ARTIFACT_DB_PATH": os.path.join(workdir, "artifacts.sqlite3"),
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+        "SERP_CACHE_PATH": os.path.join(workdir, "serp_cache.sqlite3"),
+        "LLM_CACHE_ENABLED": cache_flag,
+        "SERP_CACHE_ENABLED": cache_flag,
+        "STUB_LLM_LATENCY": str(args.llm_latency),
+        "STUB_LLM_FAILURE_RATE": str(args.llm_failure_rate),
+        "STUB_LLM_MALFORMED_RATE": str(args.llm_malformed_rate),
+        "SERP_STUB_LATENCY": str(args.serp_latency),
+        "SERP_STUB_FAILURE_RATE": str(args.serp_failure_rate),
+        "PROMPT_BUDGET_LOG": "0",
+        "BACKOFF_BASE": "0.1",
+    })
+    # Measure the app, not the production quotas, unless explicitly set
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ.setdefault("GEMINI_RPM", "1000000")
+    os.environ.setdefault("GEMINI_TPM", "1000000000")
+    os.environ.setdefault("SERPAPI_RPM", "1000000")
+
+# ================= EVENT-LOOP LAG =================
+# A probe task sleeps for a fixed interval; any extra time before it wakes
+# up is time the loop spent blocked by synchronous work.
+class LoopMonitor:
+    def __init__(self, interval):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _probe(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - started - self.interval, 0))
+
+    def start(self):
+        self.lags = []
+        self._task = asyncio.create_task(self._probe())
+
+    async def stop(self):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+    def report(self):
+        # Lag under 1ms is scheduler noise, not blocking
+        blocked = [lag for lag in self.lags if lag > 0.001]
+        return {
+            "loop_blocked_s": round(sum(blocked), 4),
+            "loop_max_lag_ms": round(max(self.lags, default=0) * 1000, 2),
+            "loop_p99_lag_ms": round(percentile(self.lags, 99) * 1000, 2),
+        }
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(p / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+# ================= REQUESTS =================
+def build_requests(seed_brief, seed_run_id):
+    keyword = seed_brief.get("primary_keyword", "AI for kids")
+    brief = json.dumps(seed_brief)
+    research_form = {
+        "target_audience": "Indian parents",
+        "content_goal": "educate",
+        "brand": "AstroKids",
+        "region": "India",
+    }
+    return {
+        "research": lambda c, i: c.post(
+            "/run-research-agent", data={**research_form, "topic": f"{keyword} {i}"}
+        ),
+        "writing": lambda c, i: c.post("/writing-agent", data={"brief": brief}),
+        "writing_sections": lambda c, i: c.post(
+            "/writing-agent", data={"brief": brief, "sections": "true"}
+        ),
+        "branding": lambda c, i: c.post("/branding-agent", json={"run_id": seed_run_id}),
+        "artifacts": lambda c, i: c.get("/article-output"),
+    }
+
+def is_success(response):
+    if response.status_code >= 400:
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return not (isinstance(body, dict) and body.get("status") == "error")
+
+async def run_endpoint(client, name, send, total, concurrency, monitor):
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await send(client, i)
+                ok = is_success(response)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    return {
+        "endpoint": name,
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 2) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+        **monitor.report(),
+    }
+
+# ================= REPORT =================
+COLUMNS = [
+    ("endpoint", 17), ("requests", 8), ("errors", 6), ("rps", 8),
+    ("p50_ms", 9), ("p95_ms", 9), ("p99_ms", 9), ("max_ms", 9),
+    ("loop_blocked_s", 14), ("loop_max_lag_ms", 15),
+]
+
+def print_report(rows, args):
+    print(
+        f"\n📊 BENCHMARK  concurrency={args.concurrency}  requests/endpoint={args.requests}  "
+        f"llm_latency={args.llm_latency}s  llm_failure_rate={args.llm_failure_rate}  "
+        f"serp_latency={args.serp_latency}s  cache={'on' if args.cache else 'off'}\n"
+    )
+    print("  ".join(name.ljust(width) for name, width in COLUMNS))
+    for row in rows:
+        print("  ".join(str(row[name]).ljust(width) for name, width in COLUMNS))
+
+# ================= MAIN =================
+async def run_benchmark(args):
+    try:
+        import httpx
+    except ImportError:
+        raise Exception("❌ The benchmark needs httpx: pip install httpx")
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app as api
+    from workspace import Workspace, RESEARCH_FILE, ARTICLE_FILE
+    from stub_llm import SEED_BRIEF, SEED_ARTICLE
+
+    seed = Workspace()
+    seed.write_json(RESEARCH_FILE, SEED_BRIEF)
+    seed.write_text(ARTICLE_FILE, SEED_ARTICLE)
+
+    requests = build_requests(SEED_BRIEF, seed.run_id)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in endpoints if e not in requests]
+    if unknown:
+        raise Exception(f"❌ Unknown endpoints: {', '.join(unknown)}")
+
+    monitor = LoopMonitor(args.lag_interval)
+    transport = httpx.ASGITransport(app=api.app)
+    rows = []
+
+    devnull = open(os.devnull, "w")
+    async with api.lifespan(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in endpoints:
+                quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+                with quiet:
+                    row = await run_endpoint(
+                        client, name, requests[name], args.requests, args.concurrency, monitor
+                    )
+                rows.append(row)
+                print(f"✅ {name}: p50 {row['p50_ms']}ms, {row['rps']} req/s, {row['errors']} errors", file=sys.stderr)
+    devnull.close()
+    return rows
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        configure_env(args, workdir)
+        rows = asyncio.run(run_benchmark(args))
+
+    print_report(rows, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": rows}, f, indent=2)
+        print(f"\n📁 Report saved → {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from heuristic_scorer import compile_phrases, avoid_phrases_for_tone
+
+# ================= CONFIG =================
+# One JSON file per brand in BRAND_PROFILES_DIR; the file name (without
+# .json) is the brand ID. The tone agent's agent_outputs/summary.json is
+# registered as the "summary" brand.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BRAND_PROFILES_DIR = os.getenv("BRAND_PROFILES_DIR", os.path.join(BASE_DIR, "brand_profiles"))
+TONE_SUMMARY_PATH = os.path.join(BASE_DIR, "agent_outputs", "summary.json")
+TONE_SUMMARY_ID = "summary"
+DEFAULT_BRAND_ID = os.getenv("DEFAULT_BRAND_ID", "default")
+
+# How often (seconds) profile files are checked for changes
+BRAND_PROFILE_CHECK_INTERVAL = float(os.getenv("BRAND_PROFILE_CHECK_INTERVAL", 2))
+
+# ================= PROFILE =================
+# Everything a request needs from a brand is derived once, when the file is
+# loaded: the prompt preamble, the rewrite rules, the avoid-phrase matcher,
+# the brand keyword matcher and a fingerprint for score-cache keys.
+def build_preamble(description, audience, do, avoid):
+    lines = [description] if description else []
+    if audience:
+        lines.append(f"Target audience: {audience}")
+    if do:
+        lines.append("Do: " + "; ".join(do))
+    if avoid:
+        lines.append("Avoid: " + "; ".join(avoid))
+    return "\n".join(lines)
+
+class BrandProfile:
+    def __init__(self, brand_id, data, path=None, mtime=None):
+        # Accepts the tone agent's {"toneParagraph": {...}} shape or the same
+        # fields at the top level
+        fields = {**data, **data.get("toneParagraph", {})}
+
+        self.brand_id = brand_id
+        self.path = path
+        self.mtime = mtime
+        self.name = fields.get("name") or brand_id
+        self.description = (fields.get("description") or "").strip()
+        self.audience = (fields.get("audience") or "").strip()
+        self.do = tuple(d.strip() for d in fields.get("do", []) if d and d.strip())
+        self.avoid = tuple(a.strip() for a in fields.get("avoid", []) if a and a.strip())
+
+        self.tone = (fields.get("tone") or build_preamble(
+            self.description, self.audience, self.do, self.avoid
+        )).strip()
+        self.rules = "\n".join(
+            [f"- {rule}" for rule in self.do] + [f"- Avoid {item}" for item in self.avoid]
+        )
+
+        self.avoid_phrases = tuple(fields.get("avoid_phrases", [])) + avoid_phrases_for_tone(
+            "\n".join((self.tone, *(f"Avoid {item}" for item in self.avoid)))
+        )
+        self.avoid_matcher = compile_phrases(self.avoid_phrases)
+        self.keywords = tuple(sorted({k.strip().lower() for k in fields.get("keywords", []) if k and k.strip()}))
+        self.keyword_matcher = compile_phrases(self.keywords)
+
+        self.fingerprint = hashlib.sha256(
+            json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def summary(self):
+        return {
+            "brand_id": self.brand_id,
+            "name": self.name,
+            "audience": self.audience,
+            "tone": self.tone,
+            "keywords": list(self.keywords),
+        }
+
+# ================= REGISTRY =================
+# Profiles are loaded once and served from memory. At most every
+# BRAND_PROFILE_CHECK_INTERVAL seconds the source files are stat'ed; a file
+# whose mtime changed is reloaded, a deleted one dropped. A file that fails
+# to parse keeps its last good profile.
+class BrandRegistry:
+    def __init__(self, directory=BRAND_PROFILES_DIR, extra_sources=None):
+        self.directory = directory
+        self.extra_sources = extra_sources or {}
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._checked = None
+
+    def sources(self):
+        sources = {}
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if name.endswith(".json"):
+                    sources[name[:-5]] = os.path.join(self.directory, name)
+        for brand_id, path in self.extra_sources.items():
+            if os.path.exists(path):
+                sources.setdefault(brand_id, path)
+        return sources
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < BRAND_PROFILE_CHECK_INTERVAL:
+            return
+
+        with self._lock:
+            self._checked = now
+            profiles = {}
+            for brand_id, path in self.sources().items():
+                current = self._profiles.get(brand_id)
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                    if current and current.path == path and current.mtime == mtime:
+                        profiles[brand_id] = current
+                        continue
+                    with open(path, "r", encoding="utf-8") as f:
+                        profiles[brand_id] = BrandProfile(brand_id, json.load(f), path, mtime)
+                    print(f"🎨 Loaded brand profile '{brand_id}'")
+                except (OSError, ValueError, TypeError, AttributeError) as e:
+                    print(f"⚠️ Brand profile '{brand_id}' not loaded: {e}")
+                    if current:
+                        profiles[brand_id] = current
+            self._profiles = profiles
+
+    def get(self, brand_id=None):
+        self.refresh()
+        brand_id = brand_id or DEFAULT_BRAND_ID
+        profile = self._profiles.get(brand_id)
+        if profile is None:
+            raise ValueError(f"❌ Unknown brand profile: {brand_id}")
+        return profile
+
+    def list(self):
+        self.refresh()
+        return [profile.summary() for profile in self._profiles.values()]
+
+brand_registry = BrandRegistry(extra_sources={TONE_SUMMARY_ID: TONE_SUMMARY_PATH})
+
+def resolve_brand(brand=None):
+    if isinstance(brand, BrandProfile):
+        return brand
+    return brand_registry.get(brand)
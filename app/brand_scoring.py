@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import hashlib
+import asyncio
+import llm_client
+from llm_cache import llm_cache, make_key
+from doc_summarizer import chunk_text, estimate_tokens
+from prompt_budget import build_prompt, AGENT_INPUT_BUDGETS
+from structured_output import generate_json, BrandScore
+
+# ================= CONFIG =================
+SCORE_DIMENSIONS = ["tone", "audience", "keywords", "clarity", "consistency"]
+SECTION_SCORE_CONCURRENCY = int(os.getenv("SECTION_SCORE_CONCURRENCY", 12))
+MIN_SECTION_CHARS = 200
+SECTION_SCORE_VERSION = "section-score-v2"
+
+# Sections longer than this are scored as overlapping windows
+SCORE_WINDOW_TOKENS = int(os.getenv("SCORE_WINDOW_TOKENS", 900))
+SCORE_WINDOW_OVERLAP_TOKENS = 100
+ISSUE_SIMILARITY = 0.8
+# Rough size of one section's JSON report, for token accounting
+SCORE_RESPONSE_TOKENS = 150
+
+# Markdown headings, or the writer's bold ALL-CAPS heading lines
+HEADING_RE = re.compile(r"^(#{1,6}\s+\S.*|\*\*[^*a-z]+\*\*:?)\s*$")
+
+# ================= SECTIONS =================
+def split_sections(article):
+    sections = []
+    heading, lines = "", []
+
+    for line in article.splitlines():
+        if HEADING_RE.match(line.strip()) and lines:
+            sections.append({"heading": heading, "text": "\n".join(lines).strip()})
+            heading, lines = line.strip(), [line]
+        else:
+            if HEADING_RE.match(line.strip()) and not lines:
+                heading = line.strip()
+            lines.append(line)
+    if lines:
+        sections.append({"heading": heading, "text": "\n".join(lines).strip()})
+
+    # Fold tiny sections (title lines, separators) into the next one so each
+    # scored unit has enough content to judge.
+    merged = []
+    carry = ""
+    for section in sections:
+        text = (carry + "\n\n" + section["text"]).strip() if carry else section["text"]
+        if len(text) < MIN_SECTION_CHARS:
+            carry = text
+            continue
+        merged.append({"heading": section["heading"], "text": text})
+        carry = ""
+    if carry:
+        if merged:
+            merged[-1]["text"] += "\n\n" + carry
+        else:
+            merged.append({"heading": "", "text": carry})
+
+    for section in merged:
+        section["hash"] = hashlib.sha256(section["text"].encode("utf-8")).hexdigest()
+    return merged
+
+# ================= WINDOWS =================
+# The whole article is scored: a section that does not fit the window budget
+# (or an article without headings) is cut into overlapping windows, each
+# scored as its own unit.
+def split_windows(sections, max_tokens=SCORE_WINDOW_TOKENS, overlap_tokens=SCORE_WINDOW_OVERLAP_TOKENS):
+    units = []
+    for section in sections:
+        if estimate_tokens(section["text"]) <= max_tokens:
+            units.append(section)
+            continue
+
+        windows = chunk_text(section["text"], max_tokens, overlap_tokens)
+        for i, text in enumerate(windows):
+            units.append({
+                "heading": f"{section['heading']} (part {i + 1}/{len(windows)})",
+                "text": text,
+                "hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            })
+    return units
+
+# ================= SECTION SCORER =================
+def _context_hash(research, brand):
+    payload = json.dumps([research, brand.fingerprint], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def section_cache_key(section, context_hash):
+    return make_key(
+        llm_client.DEFAULT_MODEL,
+        SECTION_SCORE_VERSION,
+        section["hash"],
+        {"context": context_hash}
+    )
+
+SECTION_SCORE_TEMPLATE = """
+You are a strict BRAND EVALUATION AGENT.
+
+Brand Voice Guidelines:
+{brand_tone}
+
+Research Direction:
+{research}
+
+Article Section:
+{section}
+
+Evaluate this section of a longer article on a 0–100 scale:
+
+1. Tone match
+2. Audience alignment
+3. SEO keyword usage
+4. Informational clarity (NO selling)
+5. Brand consistency
+
+Return ONLY valid JSON:
+{{
+  "overall_score": number,
+  "breakdown": {{
+    "tone": number,
+    "audience": number,
+    "keywords": number,
+    "clarity": number,
+    "consistency": number
+  }},
+  "issues": [
+    "clear short issue 1",
+    "clear short issue 2"
+  ]
+}}
+"""
+
+async def score_section(section, research, brand):
+    prompt = build_prompt(
+        "score",
+        SECTION_SCORE_TEMPLATE,
+        research,
+        brand_tone=brand.tone,
+        section=section["text"]
+    )
+
+    report = await generate_json(
+        prompt=prompt,
+        system_role="You are a brand auditor",
+        schema=BrandScore,
+        temperature=0,
+        cache=False
+    )
+    return report, estimate_tokens(prompt) + estimate_tokens(json.dumps(report))
+
+# Upper bound for scoring an article with no cached sections: one budgeted
+# prompt and one short report per section / window
+def estimate_score_tokens(article):
+    units = len(split_windows(split_sections(article)))
+    return units * (AGENT_INPUT_BUDGETS["score"] + SCORE_RESPONSE_TOKENS)
+
+# ================= AGGREGATION =================
+# Section scores are weighted by section length; issues are de-duplicated.
+def aggregate_reports(reports, weights):
+    total = sum(weights) or 1
+
+    breakdown = {}
+    for dim in SCORE_DIMENSIONS:
+        breakdown[dim] = round(sum(
+            float(r.get("breakdown", {}).get(dim, r.get("overall_score", 0))) * w
+            for r, w in zip(reports, weights)
+        ) / total)
+
+    overall = round(sum(
+        float(r.get("overall_score", 0)) * w for r, w in zip(reports, weights)
+    ) / total)
+
+    issues = dedupe_issues(
+        issue for report in reports for issue in report.get("issues", [])
+    )
+    return {"overall_score": overall, "breakdown": breakdown, "issues": issues}
+
+# Windows and sections often report the same problem in slightly different
+# words; drop issues whose word sets overlap an earlier one almost entirely.
+def _issue_words(issue):
+    return frozenset(re.findall(r"[a-z0-9]+", issue.lower()))
+
+def dedupe_issues(issues, similarity=ISSUE_SIMILARITY):
+    kept, kept_words = [], []
+    for issue in issues:
+        if not isinstance(issue, str) or not issue.strip():
+            continue
+        words = _issue_words(issue)
+        if any(
+            len(words & other) / (len(words | other) or 1) >= similarity
+            for other in kept_words
+        ):
+            continue
+        kept.append(issue.strip())
+        kept_words.append(words)
+    return kept
+
+# ================= ARTICLE SCORER =================
+# Each section (or window of a long section) is scored independently and in
+# parallel, so wall-clock time stays close to a single call. Reports are
+# cached by unit hash (plus a hash of research + brand profile); re-scoring a
+# rewritten article therefore only pays for the parts that changed.
+async def score_article(article, research, brand):
+    sections = split_windows(split_sections(article))
+    context_hash = _context_hash(research, brand)
+    semaphore = asyncio.Semaphore(SECTION_SCORE_CONCURRENCY)
+
+    async def score(section):
+        key = section_cache_key(section, context_hash)
+        cached = await asyncio.to_thread(llm_cache.get, key) if llm_cache.enabled else None
+        if cached is not None:
+            return json.loads(cached), True, 0
+
+        async with semaphore:
+            report, tokens = await score_section(section, research, brand)
+        if llm_cache.enabled:
+            await asyncio.to_thread(llm_cache.set, key, json.dumps(report))
+        return report, False, tokens
+
+    results = await asyncio.gather(*(score(s) for s in sections))
+    reports = [report for report, _, _ in results]
+
+    aggregate = aggregate_reports(reports, [len(s["text"]) for s in sections])
+    # Estimated tokens spent on this call (cached sections are free)
+    aggregate["tokens"] = sum(tokens for _, _, tokens in results)
+    aggregate["sections"] = [
+        {
+            "heading": section["heading"],
+            "hash": section["hash"][:12],
+            "overall_score": report.get("overall_score"),
+            "cached": cached,
+        }
+        for section, (report, cached, _) in zip(sections, results)
+    ]
+    return aggregate
@@ -43,7 +43,7 @@ export default function BrandingPage() {
                 headers: {
                     "Content-Type": "application/json",
                 },
-                body: JSON.stringify({}),
+                body: JSON.stringify({ run_id: sessionStorage.getItem("run_id") || "" }),
             });
 
             if (!res.ok) {
@@ -89,6 +89,7 @@ export default function BrandingPage() {
                 },
                 body: JSON.stringify({
                     suggestion: suggestionToSend || "",
+                    run_id: sessionStorage.getItem("run_id") || "",
                 }),
             });
 
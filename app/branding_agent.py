@@ -1,131 +1,77 @@
 import json
 import os
-import time
-from pathlib import Path
-import google.generativeai as genai
-from dotenv import load_dotenv
+import asyncio
+import llm_client
+import rate_limiter
+from brand_scoring import score_article, estimate_score_tokens
+from doc_summarizer import estimate_tokens
+from prompt_budget import build_prompt
+from heuristic_scorer import heuristic_score, needs_llm_review, HEURISTIC_PRESCORE
+from brand_profiles import resolve_brand
+from workspace import (
+    Workspace,
+    ARTICLE_FILE,
+    BRANDED_FILE,
+    RESEARCH_FILE,
+    read_artifact,
+)
 
 # ================= ENV =================
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+llm_client.require_api_key()
 
-if not os.getenv("GEMINI_API_KEY"):
-    raise Exception("❌ GEMINI_API_KEY not set")
-
-# ================= PATHS =================
-BASE_DIR = Path(__file__).resolve().parent
-
-RESEARCH_PATH = BASE_DIR / "agent_outputs" / "research_briefs.json"
-ARTICLE_PATH  = BASE_DIR / "outputs" / "article.md"
-OUTPUT_PATH   = BASE_DIR / "outputs" / "article_branded.md"
-
-RATE_WAIT = 30
 SCORE_THRESHOLD = 50  # Auto-regenerate if below 50%
 
-brand_tone = """
-Warm, nurturing, informative
-Target audience: Indian parents
-No sales language
-SEO-friendly but human
-"""
+# Rewrite optimizer: one candidate per temperature, scored concurrently
+REWRITE_TEMPERATURES = [0.3, 0.5, 0.7, 0.9]
+REWRITE_CANDIDATES = int(os.getenv("REWRITE_CANDIDATES", 3))
+OPTIMIZE_MAX_ROUNDS = int(os.getenv("OPTIMIZE_MAX_ROUNDS", 2))
+OPTIMIZE_TIME_BUDGET = float(os.getenv("OPTIMIZE_TIME_BUDGET", 180))
+OPTIMIZE_TOKEN_BUDGET = int(os.getenv("OPTIMIZE_TOKEN_BUDGET", 120000))
 
 # ================= HELPERS =================
-def load_json(path):
-    if not path.exists():
-        raise FileNotFoundError(f"❌ Missing file: {path}")
-    data = json.loads(path.read_text(encoding="utf-8"))
-    return data[0] if isinstance(data, list) else data
-
-def load_md(path):
-    if not path.exists():
-        raise FileNotFoundError(f"❌ Missing file: {path}")
-    return path.read_text(encoding="utf-8")
+# With a run id the inputs come from that run's workspace; without one, from
+# the shared "latest" files.
+def load_run_inputs(run_id=None):
+    article = read_artifact(ARTICLE_FILE, run_id)
+    research = json.loads(read_artifact(RESEARCH_FILE, run_id))
+    return article, research[0] if isinstance(research, list) else research
 
 # ================= BRAND SCORING AGENT =================
-def brand_score_agent(article, research, brand_tone):
-    prompt = f"""
-You are a strict BRAND EVALUATION AGENT.
-
-Brand Voice Guidelines:
-{brand_tone}
-
-Research Direction:
-{json.dumps(research, indent=2)}
-
-Article Content:
-{article[:3500]}
-
-Evaluate on a 0–100 scale:
-
-1. Tone match
-2. Audience alignment
-3. SEO keyword usage
-4. Informational clarity (NO selling)
-5. Brand consistency
-
-Return ONLY valid JSON:
-{{
-  "overall_score": number,
-  "breakdown": {{
-    "tone": number,
-    "audience": number,
-    "keywords": number,
-    "clarity": number,
-    "consistency": number
-  }},
-  "issues": [
-    "clear short issue 1",
-    "clear short issue 2"
-  ]
-}}
-"""
-
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-flash",
-        system_instruction="You are a brand auditor"
-    )
-    response = model.generate_content(
-        prompt,
-        generation_config=genai.types.GenerationConfig(temperature=0)
-    )
-
-    text = (response.text or "").strip()
-    if not text:
-        raise Exception("Empty response from model when computing brand score")
-
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            candidate = text[start:end+1]
-            try:
-                return json.loads(candidate)
-            except Exception:
-                pass
-        snippet = text[:1000].replace('\n', ' ')
-        raise Exception(f"Invalid JSON from model when computing brand score. Response snippet: {snippet}")
+# A local heuristic check runs first (milliseconds, no API call). It settles
+# the score only on a clear mechanical failure (repeated sales language,
+# keyword stuffing); every other article is sent to the LLM
+# scorer, which works section by section (see brand_scoring); unchanged sections are
+# served from the score cache, so re-scoring after a rewrite only costs the
+# sections that were edited.
+async def brand_score_agent(article, research, brand, on_provisional=None):
+    provisional = heuristic_score(article, research, brand)
+    if on_provisional:
+        await on_provisional(provisional)
+
+    if HEURISTIC_PRESCORE and not needs_llm_review(provisional):
+        return provisional
+
+    report = await score_article(article, research, brand)
+    report["source"] = "llm"
+    report["provisional_score"] = provisional["overall_score"]
+    return report
 
 # ================= REWRITE AGENT =================
-def rewrite_article(article, brand_report, research, brand_tone):
-    prompt = f"""
+REWRITE_TEMPLATE = """
 You are a SENIOR BRAND EDITOR.
 
 Brand Voice Guidelines:
 {brand_tone}
 
 Research Direction:
-{json.dumps(research, indent=2)}
+{research}
 
 Improve the article based on these insights:
-{json.dumps(brand_report.get("issues", []), indent=2)}
+{issues}
 
 Rewrite rules:
 - Improve tone, clarity, flow
-- Warm, nurturing, parent-focused
-- Indian cultural sensitivity
-- Informational only (NO sales)
+{brand_rules}
 - SEO keywords naturally
 - Preserve markdown formatting
 
@@ -135,37 +81,13 @@ Article:
 Return ONLY rewritten markdown.
 """
 
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-flash",
-        system_instruction="You are a brand editor"
-    )
-    response = model.generate_content(
-        prompt,
-        generation_config=genai.types.GenerationConfig(temperature=0.4)
-    )
-
-    return response.text
-
-# ================= API MODE =================
-def run_branding_agent_api(brand_tone, suggestion=None):
-    try:
-        article = load_md(ARTICLE_PATH)
-        research = load_json(RESEARCH_PATH)
-
-        report = brand_score_agent(article, research, brand_tone)
-        initial_score = report['overall_score']
-
-        final_article = article
-        final_score = initial_score
-
-        print(f"📊 Initial score: {initial_score}%")
-
-        if suggestion:
-            prompt = f"""
+async def rewrite_article(article, brand_report, research, brand, temperature=0.4, suggestion=None):
+    if suggestion:
+        prompt = f"""
 You are a SENIOR BRAND EDITOR.
 
 Brand Voice Guidelines:
-{brand_tone}
+{brand.tone}
 
 User Feedback:
 {suggestion}
@@ -176,32 +98,241 @@ Article:
 Rewrite the article considering the user's feedback while maintaining brand voice.
 Return ONLY rewritten markdown.
 """
-            model = genai.GenerativeModel(
-                model_name="gemini-2.5-flash",
-                system_instruction="You are a brand editor"
+    else:
+        prompt = build_prompt(
+            "rewrite",
+            REWRITE_TEMPLATE,
+            research,
+            brand_tone=brand.tone,
+            brand_rules=brand.rules,
+            issues="\n".join(f"- {issue}" for issue in brand_report.get("issues", [])),
+            article=article
+        )
+
+    text = await llm_client.call_gemini(
+        prompt=prompt,
+        system_role="You are a brand editor",
+        temperature=temperature
+    )
+    return text, estimate_tokens(prompt) + estimate_tokens(text)
+
+# ================= REWRITE OPTIMIZER =================
+# K candidate rewrites are generated and scored concurrently, one per
+# temperature. The best candidate seeds the next round; the loop stops as soon
+# as a candidate reaches the target score, or when the round, wall-clock or
+# token budget runs out. Pending candidates are cancelled on early stop.
+async def optimize_article(
+    article,
+    report,
+    research,
+    brand,
+    suggestion=None,
+    candidates=REWRITE_CANDIDATES,
+    target_score=SCORE_THRESHOLD,
+    max_rounds=OPTIMIZE_MAX_ROUNDS,
+    time_budget=OPTIMIZE_TIME_BUDGET,
+    token_budget=OPTIMIZE_TOKEN_BUDGET,
+    on_stage=None,
+):
+    candidates = max(1, min(candidates, len(REWRITE_TEMPERATURES)))
+    temperatures = REWRITE_TEMPERATURES[:candidates]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + time_budget
+
+    best = None
+    tokens_spent = 0
+    tried = []
+    rounds = 0
+    stop_reason = "max_rounds"
+    seed_article, seed_report = article, report
+
+    async def candidate(round_no, index, temperature):
+        await notify(on_stage, "rewrite", "started", round=round_no, candidate=index)
+        text, tokens = await rewrite_article(
+            seed_article, seed_report, research, brand, temperature, suggestion
+        )
+        new_report = await brand_score_agent(text, research, brand)
+        await notify(
+            on_stage, "rewrite", "finished",
+            round=round_no, candidate=index, score=new_report["overall_score"]
+        )
+        return {
+            "round": round_no,
+            "candidate": index,
+            "temperature": temperature,
+            "article": text,
+            "report": new_report,
+            # Rewrite plus (LLM) scoring of the candidate
+            "tokens": tokens + new_report.get("tokens", 0),
+        }
+
+    while rounds < max_rounds:
+        # A round costs roughly one prompt (article + research) and one
+        # article-sized answer per candidate, plus scoring each candidate.
+        projected = candidates * (
+            2 * estimate_tokens(seed_article)
+            + estimate_tokens(json.dumps(research))
+            + estimate_score_tokens(seed_article)
+        )
+        if tokens_spent + projected > token_budget:
+            stop_reason = "token_budget"
+            break
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            stop_reason = "time_budget"
+            break
+
+        rounds += 1
+        pending = {
+            asyncio.create_task(candidate(rounds, i, t))
+            for i, t in enumerate(temperatures)
+        }
+        reached = False
+        try:
+            while pending and not reached:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=deadline - loop.time(),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    stop_reason = "time_budget"
+                    break
+                for task in done:
+                    if task.exception():
+                        print(f"⚠️ Rewrite candidate failed: {task.exception()}")
+                        continue
+                    result = task.result()
+                    tokens_spent += result["tokens"]
+                    tried.append({
+                        "round": result["round"],
+                        "candidate": result["candidate"],
+                        "temperature": result["temperature"],
+                        "score": result["report"]["overall_score"],
+                        "source": result["report"].get("source"),
+                    })
+                    if best is None or result["report"]["overall_score"] > best["report"]["overall_score"]:
+                        best = result
+                    if result["report"]["overall_score"] >= target_score:
+                        reached = True
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if reached:
+            stop_reason = "threshold"
+            break
+        if stop_reason == "time_budget":
+            break
+        if best is not None:
+            seed_article, seed_report = best["article"], best["report"]
+
+    return best, {
+        "rounds": rounds,
+        "candidates": tried,
+        "tokens_spent": tokens_spent,
+        "elapsed": round(loop.time() - started, 2),
+        "stop_reason": stop_reason,
+    }
+
+# ================= API MODE =================
+async def notify(on_stage, stage, status, **details):
+    if on_stage:
+        await on_stage(stage, status, **details)
+
+async def run_branding_agent_api(
+    brand=None,
+    suggestion=None,
+    on_stage=None,
+    run_id=None,
+    auto_rewrite=True,
+    candidates=None,
+    article=None,
+    research=None,
+):
+    with rate_limiter.lane(rate_limiter.INTERACTIVE):
+        return await _run_branding_agent_api(
+            brand, suggestion, on_stage, run_id, auto_rewrite, candidates, article, research
+        )
+
+# brand is a profile or a brand ID (default profile when empty).
+# article / research may be handed over in memory (pipeline); otherwise they
+# are read from the run's workspace.
+async def _run_branding_agent_api(
+    brand, suggestion, on_stage, run_id, auto_rewrite, candidates, article, research
+):
+    try:
+        brand = resolve_brand(brand)
+        if article is None or research is None:
+            article, research = load_run_inputs(run_id)
+        workspace = Workspace(run_id)
+
+        async def on_provisional(provisional):
+            await notify(on_stage, "prescore", "finished", score=provisional["overall_score"])
+
+        await notify(on_stage, "score", "started")
+        report = await brand_score_agent(article, research, brand, on_provisional)
+        await notify(on_stage, "score", "finished")
+        initial_score = report['overall_score']
+
+        final_article = article
+        final_score = initial_score
+
+        print(f"📊 Initial score: {initial_score}%")
+
+        # Rewrite on user feedback, or automatically when below the threshold
+        if suggestion or (auto_rewrite and initial_score < SCORE_THRESHOLD):
+            best, optimization = await optimize_article(
+                article,
+                report,
+                research,
+                brand,
+                suggestion=suggestion,
+                candidates=candidates or REWRITE_CANDIDATES,
+                on_stage=on_stage,
             )
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(temperature=0.4)
+            print(
+                f"🔁 Optimizer: {len(optimization['candidates'])} candidates, "
+                f"{optimization['rounds']} rounds, stopped on {optimization['stop_reason']}"
             )
-            final_article = response.text
 
-            new_report = brand_score_agent(final_article, research, brand_tone)
-            final_score = new_report['overall_score']
-
-            OUTPUT_PATH.write_text(final_article, encoding="utf-8")
+            # Requested feedback that no candidate could apply is an error,
+            # not a silent no-op
+            if suggestion and best is None:
+                return {
+                    "status": "error",
+                    "run_id": workspace.run_id,
+                    "message": "❌ No rewrite candidate succeeded; the article was not changed",
+                    "optimization": optimization
+                }
+
+            # Without feedback, keep the original unless a candidate beats it
+            if best and (suggestion or best["report"]["overall_score"] > initial_score):
+                final_article = best["article"]
+                new_report = best["report"]
+                final_score = new_report["overall_score"]
+            else:
+                new_report = report
+
+            await workspace.write_text_async(BRANDED_FILE, final_article, score=final_score)
 
             return {
                 "status": "success",
+                "run_id": workspace.run_id,
                 "initial_score": initial_score,
                 "final_score": final_score,
                 "article": final_article,
-                "brand_score": new_report
+                "brand_score": new_report,
+                "optimization": optimization
             }
 
-        OUTPUT_PATH.write_text(article, encoding="utf-8")
+        await workspace.write_text_async(BRANDED_FILE, article, score=initial_score)
         return {
             "status": "success",
+            "run_id": workspace.run_id,
             "initial_score": initial_score,
             "final_score": initial_score,
             "article": article,
@@ -216,18 +347,39 @@ Return ONLY rewritten markdown.
             "message": str(e)
         }
 
-async def run_branding_agent(brand_tone, suggestion=None):
-    return run_branding_agent_api(brand_tone=brand_tone, suggestion=suggestion)
+async def run_branding_agent(
+    brand=None,
+    suggestion=None,
+    on_stage=None,
+    run_id=None,
+    auto_rewrite=True,
+    candidates=None,
+    article=None,
+    research=None,
+):
+    return await run_branding_agent_api(
+        brand=brand,
+        suggestion=suggestion,
+        on_stage=on_stage,
+        run_id=run_id,
+        auto_rewrite=auto_rewrite,
+        candidates=candidates,
+        article=article,
+        research=research
+    )
 
 # ================= MAIN =================
-def run():
+async def run_async(run_id=None, brand_id=None):
     print("\n🚀 BRANDING AGENT STARTED\n")
 
-    research = load_json(RESEARCH_PATH)
-    article  = load_md(ARTICLE_PATH)
+    brand = resolve_brand(brand_id)
+    print(f"🎨 Brand profile: {brand.name} ({brand.brand_id})")
+
+    article, research = load_run_inputs(run_id)
+    workspace = Workspace(run_id)
 
     print("🔍 Evaluating brand alignment...\n")
-    report = brand_score_agent(article, research, brand_tone)
+    report = await brand_score_agent(article, research, brand)
 
     print(f"📊 BRAND SCORE: {report['overall_score']}%")
     print("📌 BREAKDOWN:")
@@ -247,20 +399,44 @@ def run():
         print("\n🚫 Rewrite skipped by user.")
         return
 
-    print("\n✍️ Rewriting article...\n")
-    rewritten = rewrite_article(article, report, research, brand_tone)
-    OUTPUT_PATH.write_text(rewritten, encoding="utf-8")
+    print(f"\n✍️ Generating {REWRITE_CANDIDATES} candidate rewrites...\n")
+    best, optimization = await optimize_article(
+        article,
+        report,
+        research,
+        brand,
+        target_score=max(SCORE_THRESHOLD, report["overall_score"])
+    )
+
+    for c in optimization["candidates"]:
+        print(f"   round {c['round']} · candidate {c['candidate']} (t={c['temperature']}): {c['score']}%")
+    print(
+        f"⏱️ {optimization['elapsed']}s, ~{optimization['tokens_spent']} tokens, "
+        f"stopped on {optimization['stop_reason']}"
+    )
 
-    print("🔁 Re-evaluating rewritten article...\n")
-    new_report = brand_score_agent(rewritten, research, brand_tone)
+    if best is None:
+        print("\n❌ No rewrite candidate succeeded; keeping the original article.")
+        return
+
+    new_report = best["report"]
+    await workspace.write_text_async(BRANDED_FILE, best["article"], score=new_report["overall_score"])
 
     print(f"✅ NEW BRAND SCORE: {new_report['overall_score']}%")
     print("📌 NEW BREAKDOWN:")
     for k, v in new_report["breakdown"].items():
         print(f"   {k}: {v}")
 
-    print(f"\n📁 FINAL ARTICLE SAVED → {OUTPUT_PATH}")
+    print(f"\n📁 FINAL ARTICLE SAVED → {workspace.path(BRANDED_FILE)} (run {workspace.run_id})")
+
+def run(run_id=None, brand_id=None):
+    asyncio.run(run_async(run_id, brand_id))
 
 # ================= ENTRY =================
+# python branding_agent.py [run_id] [brand_id]
 if __name__ == "__main__":
-    run()
+    import sys
+    run(
+        run_id=sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] else None,
+        brand_id=sys.argv[2] if len(sys.argv) > 2 else None
+    )
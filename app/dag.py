@@ -0,0 +1,90 @@
+import time
+import asyncio
+import telemetry
+
+# ================= STAGE GRAPH =================
+# A stage starts as soon as all of its dependencies have finished, so stages
+# without a path between them run concurrently. Each stage function receives
+# its dependencies' results as keyword arguments (by stage name) and may be a
+# coroutine function or a plain function; plain functions run in a worker
+# thread so blocking I/O or parsing never stalls the event loop.
+class Stage:
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+async def _run_stage(stage, fn_kwargs):
+    with telemetry.span("stage", stage=telemetry.stage_label(stage.name)):
+        if asyncio.iscoroutinefunction(stage.fn):
+            return await stage.fn(**fn_kwargs)
+        return await asyncio.to_thread(stage.fn, **fn_kwargs)
+
+def _check_acyclic(by_name):
+    visiting, done = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"❌ Stage graph has a cycle through '{name}'")
+        visiting.add(name)
+        for dep in by_name[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in by_name:
+        visit(name)
+
+async def run_dag(stages, on_stage=None):
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"❌ Stage '{stage.name}' depends on unknown stage(s): {missing}")
+    _check_acyclic(by_name)
+
+    tasks = {}
+    timings = {}
+    started = time.perf_counter()
+
+    async def execute(stage):
+        dep_results = await asyncio.gather(*(get_task(dep) for dep in stage.deps))
+        fn_kwargs = dict(zip(stage.deps, dep_results))
+
+        if on_stage:
+            await on_stage(stage.name, "started")
+
+        stage_start = time.perf_counter()
+        result = await _run_stage(stage, fn_kwargs)
+        stage_end = time.perf_counter()
+
+        timings[stage.name] = {
+            "start": round(stage_start - started, 4),
+            "duration": round(stage_end - stage_start, 4),
+        }
+        if on_stage:
+            await on_stage(stage.name, "finished")
+        return result
+
+    def get_task(name):
+        if name not in tasks:
+            tasks[name] = asyncio.ensure_future(execute(by_name[name]))
+        return tasks[name]
+
+    for stage in stages:
+        get_task(stage.name)
+
+    try:
+        values = await asyncio.gather(*tasks.values())
+    except Exception:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    timings["total"] = {
+        "start": 0.0,
+        "duration": round(time.perf_counter() - started, 4),
+    }
+    return dict(zip(tasks.keys(), values)), timings
@@ -0,0 +1,110 @@
+import os
+import time
+import codecs
+import shutil
+import tempfile
+from io import BytesIO
+from pypdf import PdfReader
+
+# Kept free of agent/LLM imports: this module is loaded by the document
+# parsing worker processes.
+
+# ================= CONFIG =================
+# Upper bound on extracted text; doc_summarizer condenses it for the prompts
+DOCUMENT_CHAR_BUDGET = int(os.getenv("DOCUMENT_CHAR_BUDGET", 200_000))
+DOCUMENT_MAX_PAGES = int(os.getenv("DOCUMENT_MAX_PAGES", 500))
+UPLOAD_SPOOL_MAX_MEMORY = 1024 * 1024
+TEXT_READ_CHUNK = 64 * 1024
+
+# ================= STREAMING EXTRACTION =================
+# Uploads are consumed as streams: pages are parsed one at a time (each only
+# once) and parsing stops as soon as the character budget, the page limit or
+# the deadline is hit, so a large PDF never has to be fully parsed or held in
+# memory.
+def open_document_stream(file_content):
+    if not hasattr(file_content, "read"):
+        return BytesIO(file_content)
+
+    if hasattr(file_content, "seekable") and file_content.seekable():
+        file_content.seek(0)
+        return file_content
+
+    # Non-seekable streams are spooled: RAM up to the limit, then a temp file
+    spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY)
+    shutil.copyfileobj(file_content, spooled, TEXT_READ_CHUNK)
+    spooled.seek(0)
+    return spooled
+
+def iter_pdf_text(stream, max_pages=None, deadline=None):
+    reader = PdfReader(stream)
+    for i, page in enumerate(reader.pages):
+        if max_pages is not None and i >= max_pages:
+            break
+        if deadline is not None and time.monotonic() > deadline:
+            print(f"⏳ PDF parsing deadline reached after {i} pages")
+            break
+        text = page.extract_text()
+        if text:
+            yield text
+
+def iter_text_chunks(stream):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while chunk := stream.read(TEXT_READ_CHUNK):
+        yield decoder.decode(chunk)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def take_text(parts, max_chars=None, sep=""):
+    collected = []
+    total = 0
+    for part in parts:
+        collected.append(part)
+        total += len(part) + len(sep)
+        if max_chars is not None and total >= max_chars:
+            break
+    text = sep.join(collected)
+    return text[:max_chars] if max_chars is not None else text
+
+def extract_text_from_pdf(file_content, max_chars=None, max_pages=None, deadline=None):
+    stream = open_document_stream(file_content)
+    return take_text(iter_pdf_text(stream, max_pages, deadline), max_chars, sep="\n")
+
+# ✅ FIXED: supports FastAPI UploadFile, bytes, or None
+def extract_text_from_file(
+    file_content,
+    filename: str | None,
+    max_chars=None,
+    max_pages=None,
+    deadline=None
+):
+    if not file_content or not filename:
+        return ""
+
+    filename = filename.lower()
+
+    if filename.endswith(".pdf"):
+        return extract_text_from_pdf(file_content, max_chars, max_pages, deadline)
+
+    if filename.endswith(".txt"):
+        stream = open_document_stream(file_content)
+        return take_text(iter_text_chunks(stream), max_chars)
+
+    return ""
+
+# ================= WORKER JOB =================
+# Runs inside the process pool. `source` is either raw bytes or a path to a
+# spooled temp file; the timeout is enforced cooperatively between pages so
+# the worker returns whatever it parsed in time.
+def parse_document_job(source, filename, max_chars, max_pages, timeout):
+    deadline = time.monotonic() + timeout if timeout else None
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return extract_text_from_file(f, filename, max_chars, max_pages, deadline)
+    return extract_text_from_file(source, filename, max_chars, max_pages, deadline)
+
+def spool_to_path(file_content):
+    stream = open_document_stream(file_content)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".upload") as tmp:
+        shutil.copyfileobj(stream, tmp, TEXT_READ_CHUNK)
+        return tmp.name
@@ -0,0 +1,154 @@
+import os
+import asyncio
+import llm_client
+from llm_cache import llm_cache, make_key
+from structured_output import generate_json, ChunkSummaries
+
+# ================= CONFIG =================
+# Rough chars-per-token ratio used for budgeting; exact counts are not needed
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = int(os.getenv("DOC_CHUNK_TOKENS", 1500))
+CHUNK_OVERLAP_TOKENS = 100
+CHUNKS_PER_CALL = 4
+SUMMARY_CONCURRENCY = int(os.getenv("DOC_SUMMARY_CONCURRENCY", 4))
+MAX_REDUCE_ROUNDS = 3
+FALLBACK_SUMMARY_CHARS = 800
+
+# Size of the condensed context handed to the research prompts
+DOCUMENT_CONTEXT_CHARS = 3000
+
+SUMMARY_SYSTEM_ROLE = "Document summarization agent. Preserve facts, terms and brand rules."
+CHUNK_CACHE_VERSION = "chunk-summary-v1"
+
+# ================= CHUNKING =================
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        # Prefer to cut on a paragraph, then a line, then a sentence boundary
+        if end < len(text):
+            window = text[start:end]
+            for sep in ("\n\n", "\n", ". "):
+                cut = window.rfind(sep)
+                if cut > max_chars // 2:
+                    end = start + cut + len(sep)
+                    break
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap_chars, start + 1)
+    return chunks
+
+# ================= MAP =================
+def chunk_cache_key(chunk):
+    return make_key(llm_client.DEFAULT_MODEL, CHUNK_CACHE_VERSION, chunk, {})
+
+async def summarize_chunk_batch(chunks):
+    numbered = "\n\n".join(
+        f"### CHUNK {i + 1}\n{chunk}" for i, chunk in enumerate(chunks)
+    )
+    prompt = f"""
+Summarize each document chunk below independently in 3-6 bullet points.
+Keep concrete facts, names, numbers, audience details and tone/brand rules.
+
+Return ONLY JSON with exactly {len(chunks)} summaries, in chunk order:
+{{
+  "summaries": []
+}}
+
+{numbered}
+"""
+
+    try:
+        summaries = (await generate_json(
+            prompt=prompt,
+            system_role=SUMMARY_SYSTEM_ROLE,
+            schema=ChunkSummaries,
+            temperature=0.2
+        ))["summaries"]
+    except Exception as e:
+        print(f"⚠️ Chunk summary unusable: {e}")
+        summaries = []
+
+    if len(summaries) != len(chunks):
+        # A single chunk that cannot be summarised is kept, clipped, as-is;
+        # a bad batch falls back to one call per chunk
+        if len(chunks) == 1:
+            return ["\n".join(summaries) or chunks[0][:FALLBACK_SUMMARY_CHARS]]
+        results = await asyncio.gather(*(summarize_chunk_batch([c]) for c in chunks))
+        return [r[0] for r in results]
+    return summaries
+
+async def summarize_chunks(chunks, concurrency=SUMMARY_CONCURRENCY):
+    if llm_cache.enabled:
+        summaries = await asyncio.to_thread(
+            llm_cache.get_many, [chunk_cache_key(chunk) for chunk in chunks]
+        )
+    else:
+        summaries = [None] * len(chunks)
+    pending = [i for i, summary in enumerate(summaries) if summary is None]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_batch(indexes):
+        async with semaphore:
+            results = await summarize_chunk_batch([chunks[i] for i in indexes])
+        for i, summary in zip(indexes, results):
+            summaries[i] = summary
+            if llm_cache.enabled and summary:
+                await asyncio.to_thread(llm_cache.set, chunk_cache_key(chunks[i]), summary)
+
+    batches = [
+        pending[i:i + CHUNKS_PER_CALL]
+        for i in range(0, len(pending), CHUNKS_PER_CALL)
+    ]
+    await asyncio.gather(*(run_batch(batch) for batch in batches))
+    return summaries
+
+# ================= REDUCE =================
+async def merge_summaries(summaries, max_chars=DOCUMENT_CONTEXT_CHARS):
+    joined = "\n\n".join(summaries)
+    prompt = f"""
+Merge the section summaries below into one condensed brief of the whole
+document, at most {max_chars} characters. Remove repetition, keep the most
+important facts, audience details and brand/tone rules.
+
+Return ONLY the condensed brief as plain text.
+
+SECTION SUMMARIES:
+{joined}
+"""
+
+    res = await llm_client.call_gemini(
+        prompt=prompt,
+        system_role=SUMMARY_SYSTEM_ROLE,
+        temperature=0.2,
+        cache=True
+    )
+    return res[:max_chars]
+
+# ================= MAP-REDUCE ENTRY =================
+async def summarize_document(text, max_chars=DOCUMENT_CONTEXT_CHARS):
+    text = (text or "").strip()
+    if len(text) <= max_chars:
+        return text
+
+    summaries = await summarize_chunks(chunk_text(text))
+
+    # Very long documents may need more than one reduce round
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if estimate_tokens("\n\n".join(summaries)) <= CHUNK_TOKENS * CHUNKS_PER_CALL:
+            break
+        summaries = await summarize_chunks(chunk_text("\n\n".join(summaries)))
+
+    return await merge_summaries(summaries, max_chars)
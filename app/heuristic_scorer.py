@@ -0,0 +1,164 @@
+import os
+import re
+from functools import lru_cache
+
+# ================= CONFIG =================
+# The heuristic only measures mechanical properties (keywords, banned
+# phrases, readability). It settles a score on its own only when one of them
+# clearly fails: repeated sales language or keyword stuffing. Anything
+# weaker is reported as an issue and the article goes to the LLM scorer. A
+# failing article's score is capped at HEURISTIC_FAILURE_SCORE.
+HEURISTIC_PRESCORE = os.getenv("HEURISTIC_PRESCORE", "1") != "0"
+HEURISTIC_FAILURE_SCORE = int(os.getenv("HEURISTIC_FAILURE_SCORE", 30))
+SALES_FAILURE_HITS = 2
+
+# Call-to-action phrases that break a "No sales language" rule. Multi-word
+# only: single words like "discount" also show up in informational copy.
+SALES_LEXICON = [
+    "buy now", "order now", "order today", "shop now", "add to cart",
+    "limited time offer", "limited offer", "exclusive offer", "special offer",
+    "act now", "don't miss out", "dont miss out", "last chance",
+    "use promo code", "best price guaranteed", "lowest price guaranteed",
+    "start your free trial", "sign up now", "subscribe now", "call now",
+    "money back guarantee", "guaranteed results", "100% guaranteed",
+]
+
+# ================= PRECOMPILED MATCHERS =================
+# One alternation regex per phrase set, compiled once and reused; longer
+# phrases first so overlapping alternatives match greedily.
+@lru_cache(maxsize=256)
+def compile_phrases(phrases):
+    phrases = sorted({p.strip().lower() for p in phrases if p and p.strip()}, key=len, reverse=True)
+    if not phrases:
+        return None
+    pattern = "|".join(
+        (r"\b" if p[0].isalnum() else "") + re.escape(p) + (r"\b" if p[-1].isalnum() else "")
+        for p in phrases
+    )
+    return re.compile(pattern, re.IGNORECASE)
+
+# Only a rule against sales language ("No sales language", "Avoid
+# sales-driven messaging") enables the lexicon; "sales-driven, persuasive"
+# does not.
+NEGATED_SALES_RE = re.compile(
+    r"\b(?:no|not|never|avoid|without|don't|do not)\b[^.;\n]{0,40}?\bsales?\b", re.IGNORECASE
+)
+
+@lru_cache(maxsize=64)
+def avoid_phrases_for_tone(brand_tone):
+    return tuple(SALES_LEXICON) if NEGATED_SALES_RE.search(brand_tone or "") else ()
+
+def count_matches(matcher, text):
+    if matcher is None:
+        return {}
+    counts = {}
+    for match in matcher.finditer(text):
+        key = match.group(0).lower()
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+# ================= READABILITY =================
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z']*")
+SENTENCE_RE = re.compile(r"[.!?]+(?:\s|$)|\n\s*[-*•]\s+")
+VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+
+def count_syllables(word):
+    word = word.lower()
+    groups = len(VOWEL_GROUP_RE.findall(word))
+    if word.endswith("e") and groups > 1 and not word.endswith("le"):
+        groups -= 1
+    return max(groups, 1)
+
+def flesch_reading_ease(text):
+    words = WORD_RE.findall(text)
+    if not words:
+        return 0.0
+    sentences = max(len(SENTENCE_RE.findall(text)), 1)
+    syllables = sum(count_syllables(w) for w in words)
+    return 206.835 - 1.015 * (len(words) / sentences) - 84.6 * (syllables / len(words))
+
+# ================= SCORER =================
+def clamp(value, low=0, high=100):
+    return max(low, min(high, round(value)))
+
+def heuristic_score(article, research, brand):
+    text = article or ""
+    lower = text.lower()
+    words = WORD_RE.findall(text)
+    word_count = max(len(words), 1)
+    issues = []
+
+    # ---------- keywords ----------
+    primary = (research.get("primary_keyword") or "").strip()
+    secondary = tuple(k for k in research.get("secondary_keywords", []) if k)
+
+    primary_hits = count_matches(compile_phrases((primary,)), text) if primary else {}
+    secondary_hits = count_matches(compile_phrases(secondary), text)
+
+    primary_count = sum(primary_hits.values())
+    intro = lower[:max(len(lower) // 8, 600)]
+    primary_in_intro = bool(primary) and primary.lower() in intro
+    secondary_coverage = len(secondary_hits) / len(secondary) if secondary else 1.0
+    density = primary_count * max(len(primary.split()), 1) / word_count
+
+    failures = []
+    keywords = 40 * secondary_coverage
+    keywords += 30 if primary_count else 0
+    keywords += 30 if primary_in_intro else 0
+    if primary and not primary_count:
+        issues.append(f"Primary keyword '{primary}' is never used")
+    elif primary and not primary_in_intro:
+        issues.append(f"Primary keyword '{primary}' is missing from the introduction")
+    if secondary and secondary_coverage < 0.5:
+        issues.append("Fewer than half of the secondary keywords are used")
+    if density > 0.03 and primary_count > 1:
+        keywords -= 25
+        failures.append("Primary keyword density suggests keyword stuffing")
+
+    # ---------- brand profile (matchers precompiled per profile) ----------
+    brand_hits = count_matches(brand.keyword_matcher, text)
+    brand_coverage = len(brand_hits) / len(brand.keywords) if brand.keywords else 1.0
+    if brand.keywords:
+        keywords = 0.8 * keywords + 20 * brand_coverage
+        if brand_coverage < 0.5:
+            issues.append("Fewer than half of the brand keywords are used")
+
+    sales_hits = count_matches(brand.avoid_matcher, text)
+    sales_count = sum(sales_hits.values())
+    if sales_hits:
+        message = "Sales language found: " + ", ".join(sorted(sales_hits))
+        (failures if sales_count >= SALES_FAILURE_HITS else issues).append(message)
+
+    # ---------- readability ----------
+    reading_ease = flesch_reading_ease(text)
+    if reading_ease < 40:
+        issues.append("Text is hard to read; shorten sentences and simplify words")
+
+    # Tone, audience and consistency are not measurable here and are left
+    # out rather than filled with a constant
+    breakdown = {
+        "keywords": clamp(keywords),
+        "clarity": clamp(reading_ease - 12 * sales_count),
+    }
+    overall = clamp(sum(breakdown.values()) / len(breakdown))
+    if failures:
+        overall = min(overall, HEURISTIC_FAILURE_SCORE)
+
+    return {
+        "overall_score": overall,
+        "breakdown": breakdown,
+        "issues": failures + issues,
+        "failures": failures,
+        "source": "heuristic",
+        "metrics": {
+            "word_count": len(words),
+            "reading_ease": round(reading_ease, 1),
+            "primary_keyword_count": primary_count,
+            "secondary_keyword_coverage": round(secondary_coverage, 2),
+            "sales_phrases": sales_count,
+            "brand_keyword_coverage": round(brand_coverage, 2),
+        },
+    }
+
+def needs_llm_review(report):
+    return not report.get("failures")
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+
+# ================= CONFIG =================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(BASE_DIR, "cache", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+# ================= JOB RECORD =================
+def new_job(kind, params, idempotency_key=None):
+    now = time.time()
+    return {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": QUEUED,
+        "params": params,
+        "idempotency_key": idempotency_key,
+        "events": [],
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+# ================= BACKENDS =================
+# A backend only has to persist and look up job dicts; the manager keeps all
+# scheduling state in memory. Progress events are stored one by one with
+# append_event; save() persists everything else about the job.
+def job_fields(job):
+    return {k: v for k, v in job.items() if k != "events"}
+
+class MemoryJobBackend:
+    def __init__(self):
+        self._jobs = {}
+        self._events = {}
+
+    def save(self, job):
+        self._jobs[job["id"]] = json.loads(json.dumps(job_fields(job), default=str))
+
+    def append_event(self, job_id, seq, event):
+        self._events.setdefault(job_id, []).append(json.loads(json.dumps(event, default=str)))
+        if job_id in self._jobs:
+            self._jobs[job_id]["updated_at"] = event["time"]
+
+    def _with_events(self, job):
+        return {**job, "events": list(self._events.get(job["id"], []))}
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return self._with_events(job) if job else None
+
+    def find_by_key(self, kind, idempotency_key):
+        for job in self._jobs.values():
+            if job["kind"] == kind and job["idempotency_key"] == idempotency_key:
+                return self._with_events(job)
+        return None
+
+    def list_unfinished(self):
+        return [self._with_events(job) for job in self._jobs.values() if job["status"] not in FINISHED]
+
+class SQLiteJobBackend:
+    def __init__(self, path=JOB_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                idempotency_key TEXT,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (kind, idempotency_key)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def save(self, job):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(id, kind, status, idempotency_key, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job["id"],
+                    job["kind"],
+                    job["status"],
+                    job["idempotency_key"],
+                    json.dumps(job_fields(job), ensure_ascii=False, default=str),
+                    job["updated_at"],
+                )
+            )
+            self._conn.commit()
+
+    def append_event(self, job_id, seq, event):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, data) VALUES (?, ?, ?)",
+                (job_id, seq, json.dumps(event, ensure_ascii=False, default=str))
+            )
+            self._conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ?", (event["time"], job_id)
+            )
+            self._conn.commit()
+
+    def _fetch(self, query, params):
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            jobs = [json.loads(row[0]) for row in rows]
+            for job in jobs:
+                events = self._conn.execute(
+                    "SELECT data FROM job_events WHERE job_id = ? ORDER BY seq", (job["id"],)
+                ).fetchall()
+                # Rows written before events had their own table carry them inline
+                job["events"] = job.get("events", []) + [json.loads(e[0]) for e in events]
+        return jobs
+
+    def get(self, job_id):
+        rows = self._fetch("SELECT data FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def find_by_key(self, kind, idempotency_key):
+        rows = self._fetch(
+            "SELECT data FROM jobs WHERE kind = ? AND idempotency_key = ? "
+            "ORDER BY updated_at DESC LIMIT 1",
+            (kind, idempotency_key)
+        )
+        return rows[0] if rows else None
+
+    def list_unfinished(self):
+        return self._fetch(
+            "SELECT data FROM jobs WHERE status IN (?, ?)",
+            (QUEUED, RUNNING)
+        )
+
+def make_backend(name=JOB_BACKEND):
+    if name == "memory":
+        return MemoryJobBackend()
+    if name == "sqlite":
+        return SQLiteJobBackend()
+    raise ValueError(f"❌ Unknown job backend: {name}")
+
+# ================= JOB MANAGER =================
+# Jobs are queued on an in-process asyncio.Queue and executed by a fixed pool
+# of worker tasks. Every state change is persisted, so a client that
+# reconnects polls the stored result instead of re-running the pipeline.
+class JobManager:
+    def __init__(self, backend=None, workers=JOB_WORKERS):
+        self.backend = backend or make_backend()
+        self.workers = workers
+        self.handlers = {}
+        self._queue = None
+        self._write_lock = None
+        self._tasks = []
+        self._subscribers = {}
+
+    def register(self, kind, handler):
+        # handler(params, progress) -> JSON-serialisable result
+        self.handlers[kind] = handler
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._write_lock = asyncio.Lock()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+        # Recover state from a previous process
+        for job in self.backend.list_unfinished():
+            if job["status"] == RUNNING:
+                job.update(status=FAILED, error="Interrupted by server restart")
+                event = {"stage": "job", "status": FAILED, "time": time.time()}
+                self._persist(job, self._record(job, event), event, job_fields(job))
+            else:
+                self._queue.put_nowait(job["id"])
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind, params, idempotency_key=None):
+        if kind not in self.handlers:
+            raise ValueError(f"❌ Unknown job type: {kind}")
+        self.start()
+
+        if idempotency_key:
+            existing = self.backend.find_by_key(kind, idempotency_key)
+            if existing and existing["status"] != FAILED:
+                return existing
+
+        job = new_job(kind, params, idempotency_key)
+        await asyncio.to_thread(self.backend.save, job)
+        await self._queue.put(job["id"])
+        return job
+
+    def get(self, job_id):
+        return self.backend.get(job_id)
+
+    # ---------- progress / subscriptions ----------
+    # Each event is written as its own row instead of re-serialising the
+    # whole job, and the job row is only rewritten on status changes. Writes
+    # run in a thread, one at a time, so rows land in order.
+    def _record(self, job, event):
+        job["events"].append(event)
+        job["updated_at"] = event["time"]
+        return len(job["events"]) - 1
+
+    def _persist(self, job, seq, event, fields=None):
+        self.backend.append_event(job["id"], seq, event)
+        if fields is not None:
+            self.backend.save(fields)
+
+    async def _publish(self, job, event, status_changed=False):
+        seq = self._record(job, event)
+        fields = job_fields(job) if status_changed else None
+        async with self._write_lock:
+            await asyncio.to_thread(self._persist, job, seq, event, fields)
+        for queue in self._subscribers.get(job["id"], ()):
+            queue.put_nowait(event)
+
+    async def _finish(self, job, status, result=None, error=None):
+        job["status"] = status
+        job["result"] = result
+        job["error"] = error
+        await self._publish(job, {"stage": "job", "status": status, "time": time.time()}, status_changed=True)
+
+    async def subscribe(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return
+
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            # Replay what already happened, then follow live events
+            for event in job["events"]:
+                yield event
+            if job["status"] in FINISHED:
+                return
+            while True:
+                event = await queue.get()
+                yield event
+                if event["stage"] == "job" and event["status"] in FINISHED:
+                    return
+        finally:
+            self._subscribers[job_id].discard(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    # ---------- execution ----------
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        job = self.backend.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+
+        job["status"] = RUNNING
+        await self._publish(job, {"stage": "job", "status": RUNNING, "time": time.time()}, status_changed=True)
+
+        async def progress(stage, status, **details):
+            await self._publish(job, {"stage": stage, "status": status, "time": time.time(), **details})
+
+        try:
+            result = await self.handlers[job["kind"]](job["params"], progress)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            await self._finish(job, FAILED, error=str(e))
+            return
+
+        if isinstance(result, dict) and result.get("status") == "error":
+            await self._finish(job, FAILED, result=result, error=result.get("message"))
+        else:
+            await self._finish(job, SUCCEEDED, result=result)
+
+job_manager = JobManager()
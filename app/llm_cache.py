@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ================= CONFIG =================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(BASE_DIR, "cache", "llm_cache.sqlite3")
+)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Limits are checked every N writes, so the store may briefly run up to N-1
+# entries over them
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", 50))
+
+# ================= KEYING =================
+def make_key(model, system_instruction, prompt, generation_config):
+    payload = json.dumps(
+        {
+            "model": model,
+            "system_instruction": system_instruction or "",
+            "prompt": prompt,
+            "generation_config": generation_config or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# ================= SQLITE STORE =================
+# Content-addressed response store. Entries expire after `ttl` seconds and the
+# least recently used rows are evicted once either the entry or byte budget
+# is exceeded. Every method does blocking SQLite I/O: coroutines call them
+# through asyncio.to_thread.
+class LLMCache:
+    def __init__(
+        self,
+        path=LLM_CACHE_PATH,
+        ttl=LLM_CACHE_TTL,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        max_bytes=LLM_CACHE_MAX_BYTES,
+        enabled=LLM_CACHE_ENABLED,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed "
+                "ON responses (accessed_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (now, key)
+            )
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now)
+            )
+            self._maybe_evict(conn, now)
+            conn.commit()
+
+    # A cheap count / size check first; the LRU deletes only run when a
+    # budget is actually exceeded
+    def _maybe_evict(self, conn, now):
+        self._writes += 1
+        if (self._writes - 1) % LLM_CACHE_EVICT_EVERY:
+            return
+
+        conn.execute(
+            "DELETE FROM responses WHERE created_at < ?",
+            (now - self.ttl,)
+        )
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if entries > self.max_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        if size > self.max_bytes:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM ("
+                "SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS running "
+                "FROM responses) WHERE running > ?)",
+                (self.max_bytes,)
+            )
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            conn = self._connect()
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+llm_cache = LLMCache()
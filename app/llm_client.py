@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+from functools import lru_cache
+import google.generativeai as genai
+from dotenv import load_dotenv
+import rate_limiter
+import telemetry
+from llm_cache import llm_cache, make_key
+
+# ================= ENV =================
+# The gateway is the only place that loads .env and configures the Gemini SDK;
+# agents import it instead of calling genai.configure() themselves.
+load_dotenv()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+genai.configure(api_key=GEMINI_API_KEY)
+
+# ================= CONFIG =================
+DEFAULT_MODEL = "gemini-2.5-flash"
+# LLM_MODE=stub answers from the local stand-in model (stub_llm) instead of
+# the network, like SERP_MODE=stub does for SerpAPI
+LLM_MODE = os.getenv("LLM_MODE", "live")
+MAX_RETRIES = 5
+MODEL_POOL_SIZE = 32
+
+# Token budgeting before the call: prompt size plus an assumed answer size,
+# corrected from usage_metadata once the response arrives
+CHARS_PER_TOKEN = 4
+DEFAULT_OUTPUT_TOKENS = 1024
+
+def require_api_key():
+    if not GEMINI_API_KEY and LLM_MODE != "stub":
+        raise Exception("❌ GEMINI_API_KEY not set")
+
+# ================= MODEL POOL =================
+# GenerativeModel handles are immutable once built, so one instance per
+# (model, system_instruction) pair is shared by every call and every agent.
+@lru_cache(maxsize=MODEL_POOL_SIZE)
+def get_model(model=DEFAULT_MODEL, system_instruction=None):
+    if LLM_MODE == "stub":
+        from stub_llm import StubModel
+        return StubModel(model, system_instruction)
+    return genai.GenerativeModel(
+        model_name=model,
+        system_instruction=system_instruction,
+    )
+
+def build_generation_config(temperature=0.3, **overrides):
+    return genai.types.GenerationConfig(temperature=temperature, **overrides)
+
+def estimate_call_tokens(prompt, system_role, generation_config):
+    chars = len(str(prompt)) + len(system_role or "")
+    output = generation_config.get("max_output_tokens") or DEFAULT_OUTPUT_TOKENS
+    return chars // CHARS_PER_TOKEN + output
+
+def usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+def record_usage(span, response, prompt, text):
+    usage = getattr(response, "usage_metadata", None)
+    span.set(
+        prompt_tokens=getattr(usage, "prompt_token_count", None)
+            or len(str(prompt)) // CHARS_PER_TOKEN,
+        response_tokens=getattr(usage, "candidates_token_count", None)
+            or len(text) // CHARS_PER_TOKEN,
+    )
+
+# ================= RETRY POLICY =================
+# Only 429 / 5xx / network errors are retried, after a jittered exponential
+# backoff. A 429 also puts the model's limiter into a shared cooldown, so
+# every queued caller waits instead of retrying in lockstep.
+async def handle_failure(error, attempt, limiter):
+    if not rate_limiter.is_retryable(error):
+        raise Exception(f"❌ Gemini error: {error}") from error
+    if attempt >= MAX_RETRIES - 1:
+        raise Exception("❌ Gemini failed after retries") from error
+
+    delay = rate_limiter.backoff_delay(attempt, error)
+    print(f"⏳ Gemini error: {error}. Retrying in {delay:.1f}s...")
+    if rate_limiter.is_rate_limited(error):
+        limiter.penalize(delay)
+    else:
+        await asyncio.sleep(delay)
+
+# ================= RESPONSE CACHE =================
+# Deterministic (temperature 0) calls are served from the on-disk cache by
+# default; sampled calls bypass it unless the caller passes cache=True.
+def should_cache(temperature, cache=None):
+    if not llm_cache.enabled:
+        return False
+    if cache is None:
+        return temperature == 0
+    return cache
+
+# ================= ASYNC GEMINI CONNECTOR =================
+# Shared by the research, writing and branding agents. Uses the native async
+# client so a slow call (or a retry wait) only suspends the awaiting task and
+# never blocks the event loop for other requests.
+async def call_gemini(
+    prompt,
+    system_role,
+    model=DEFAULT_MODEL,
+    temperature=0.3,
+    cache=None,
+    **generation_config
+):
+    with telemetry.span("llm_call", model=model) as span:
+        cache_key = None
+        if should_cache(temperature, cache):
+            cache_key = make_key(
+                model,
+                system_role,
+                prompt,
+                {"temperature": temperature, **generation_config}
+            )
+            cached = await asyncio.to_thread(llm_cache.get, cache_key)
+            span.set(cache_hit=cached is not None)
+            if cached is not None:
+                return cached
+
+        model_obj = get_model(model, system_role)
+        config = build_generation_config(temperature, **generation_config)
+        limiter = rate_limiter.for_model(model)
+        estimated = estimate_call_tokens(prompt, system_role, generation_config)
+
+        for attempt in range(MAX_RETRIES):
+            span.set(retries=attempt)
+            await limiter.acquire(estimated)
+            try:
+                response = await model_obj.generate_content_async(
+                    prompt,
+                    generation_config=config
+                )
+                text = (response.text or "").strip()
+                limiter.settle(estimated, usage_tokens(response))
+                record_usage(span, response, prompt, text)
+                break
+            except Exception as e:
+                await handle_failure(e, attempt, limiter)
+
+        if cache_key and text:
+            await asyncio.to_thread(llm_cache.set, cache_key, text)
+        return text
+
+# ================= STREAMING CONNECTOR =================
+# Yields text chunks as Gemini produces them. Retries only happen before the
+# first chunk has been handed to the caller; a failure mid-stream is raised.
+async def stream_gemini(
+    prompt,
+    system_role,
+    model=DEFAULT_MODEL,
+    temperature=0.3,
+    **generation_config
+):
+    model_obj = get_model(model, system_role)
+    config = build_generation_config(temperature, **generation_config)
+    limiter = rate_limiter.for_model(model)
+    estimated = estimate_call_tokens(prompt, system_role, generation_config)
+
+    opened = time.perf_counter()
+    with telemetry.span("llm_stream", model=model) as span:
+        for attempt in range(MAX_RETRIES):
+            span.set(retries=attempt)
+            await limiter.acquire(estimated)
+            started = False
+            parts = []
+            try:
+                response = await model_obj.generate_content_async(
+                    prompt,
+                    generation_config=config,
+                    stream=True
+                )
+                async for chunk in response:
+                    text = chunk.text
+                    if text:
+                        if not started:
+                            span.set(first_chunk=round(time.perf_counter() - opened, 3))
+                        started = True
+                        parts.append(text)
+                        yield text
+                limiter.settle(estimated, usage_tokens(response))
+                record_usage(span, response, prompt, "".join(parts))
+                return
+            except Exception as e:
+                if started:
+                    raise
+                await handle_failure(e, attempt, limiter)
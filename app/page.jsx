@@ -60,7 +60,15 @@ export default function ResearchPage() {
             const data = await res.json();
 
             setResearchBrief(data);
-            setMessage("✅ Research brief generated successfully");
+            // Writing and branding pages work on this run's workspace
+            if (data.run_id) {
+                sessionStorage.setItem("run_id", data.run_id);
+            }
+            setMessage(
+                data.briefs?.length > 1
+                    ? `✅ ${data.briefs.length} research briefs generated (showing the first)`
+                    : "✅ Research brief generated successfully"
+            );
 
         } catch (err) {
             setError(err.message);
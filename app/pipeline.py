@@ -0,0 +1,127 @@
+import json
+from dag import Stage, run_dag
+from research_agent import run_research_agent, ResearchRequest
+from writing_agent import write_article
+from branding_agent import run_branding_agent
+from workspace import Workspace, RESEARCH_FILE, ARTICLE_FILE
+from brand_profiles import resolve_brand
+
+# ================= CONFIG =================
+PIPELINE_STAGES = ["research", "article", "branding"]
+
+# ================= FULL PIPELINE =================
+# research → article → branding in one call, on the shared DAG runner. The
+# brief and the article are handed to the next stage in memory; each stage
+# still writes its artifact to the run workspace, which is what makes a run
+# resumable: with resume_from="article" the brief is read back once from the
+# workspace and research is skipped, with resume_from="branding" the article
+# is too.
+def cached_stage(workspace, name, parse=False):
+    text = workspace.read_text(name)
+    if not parse:
+        return text
+    data = json.loads(text)
+    return data[0] if isinstance(data, list) else data
+
+def build_pipeline_stages(
+    request_data,
+    workspace,
+    file_content=None,
+    filename=None,
+    suggestion=None,
+    brand=None,
+    brand_suggestion=None,
+    sections=False,
+    resume_from="research",
+    on_stage=None,
+):
+    if resume_from not in PIPELINE_STAGES:
+        raise ValueError(f"❌ Unknown pipeline stage: {resume_from}")
+    skip = PIPELINE_STAGES[:PIPELINE_STAGES.index(resume_from)]
+
+    async def research():
+        if "research" in skip:
+            return cached_stage(workspace, RESEARCH_FILE, parse=True)
+
+        # One brief per pipeline run
+        single = request_data.model_copy(update={"blog_count": 1, "topics": []})
+        result = await run_research_agent(
+            single, file_content, filename, suggestion,
+            on_stage=on_stage,
+            run_id=workspace.run_id
+        )
+        return {k: v for k, v in result.items() if k not in ("run_id", "stage_timings")}
+
+    async def article(research):
+        if "article" in skip:
+            return cached_stage(workspace, ARTICLE_FILE)
+        return await write_article(research, workspace, sections=sections)
+
+    async def branding(research, article):
+        result = await run_branding_agent(
+            brand=brand,
+            suggestion=brand_suggestion,
+            on_stage=on_stage,
+            run_id=workspace.run_id,
+            article=article,
+            research=research
+        )
+        if result.get("status") == "error":
+            raise Exception(result.get("message"))
+        return result
+
+    return [
+        Stage("research", research),
+        Stage("article", article, deps=["research"]),
+        Stage("branding", branding, deps=["research", "article"]),
+    ]
+
+async def run_pipeline(
+    request_data: ResearchRequest,
+    brand_id=None,
+    file_content=None,
+    filename=None,
+    suggestion=None,
+    brand_suggestion=None,
+    sections=False,
+    resume_from="research",
+    run_id=None,
+    on_stage=None,
+):
+    if resume_from != "research" and not run_id:
+        raise ValueError("❌ Resuming a pipeline needs the run_id of an earlier run")
+    # Fail before any stage runs on an unknown brand
+    brand = resolve_brand(brand_id)
+
+    workspace = Workspace(run_id)
+    results, timings = await run_dag(
+        build_pipeline_stages(
+            request_data,
+            workspace,
+            file_content,
+            filename,
+            suggestion,
+            brand,
+            brand_suggestion,
+            sections,
+            resume_from,
+            on_stage,
+        ),
+        on_stage=on_stage
+    )
+    print(f"⏱️ Pipeline timings: {timings['total']}")
+
+    branding = results["branding"]
+    return {
+        "status": "success",
+        "run_id": workspace.run_id,
+        "brand_id": brand.brand_id,
+        "resumed_from": resume_from,
+        "brief": results["research"],
+        "article": branding["article"],
+        "initial_score": branding["initial_score"],
+        "final_score": branding["final_score"],
+        "brand_score": branding["brand_score"],
+        "optimization": branding.get("optimization"),
+        "stage_timings": timings,
+    }
@@ -0,0 +1,114 @@
+import os
+import re
+import json
+from functools import lru_cache
+import telemetry
+from doc_summarizer import estimate_tokens, CHARS_PER_TOKEN
+
+# ================= CONFIG =================
+# Total input budget (estimated tokens) per agent prompt. The research
+# context gets whatever the template and the other parts leave over.
+AGENT_INPUT_BUDGETS = {
+    "score": int(os.getenv("SCORE_PROMPT_BUDGET", 1500)),
+    "rewrite": int(os.getenv("REWRITE_PROMPT_BUDGET", 5000)),
+}
+MIN_RESEARCH_TOKENS = 120
+# PROMPT_BUDGET_LOG=1 also prints the per-prompt breakdown; the numbers are
+# always recorded on the "prompt_budget" telemetry span
+PROMPT_BUDGET_LOG = os.getenv("PROMPT_BUDGET_LOG", "0") == "1"
+
+# Research fields each agent actually reads, and the numbered
+# writing_instructions sections worth keeping for it.
+AGENT_FIELDS = {
+    "score": ["primary_keyword", "secondary_keywords", "content_angle"],
+    "rewrite": ["primary_keyword", "secondary_keywords", "question_keywords", "content_angle"],
+}
+AGENT_INSTRUCTION_SECTIONS = {
+    "score": ("TONE & VOICE", "SEO PLACEMENT", "CONSTRAINTS"),
+    "rewrite": ("TONE & VOICE", "SEO PLACEMENT", "CONTENT DEPTH", "CONSTRAINTS"),
+}
+
+INSTRUCTION_SECTION_RE = re.compile(r"^\s*\d+\.\s*([A-Z][A-Z &/-]+):\s*$", re.MULTILINE)
+
+# ================= WRITING INSTRUCTIONS =================
+# The research agent's writing_instructions is a long numbered list. Keep
+# only the sections relevant to the agent and squeeze out indentation.
+# Cached: the same brief is condensed once per agent, not once per call.
+@lru_cache(maxsize=128)
+def condense_instructions(text, sections=()):
+    if not text:
+        return ""
+
+    matches = list(INSTRUCTION_SECTION_RE.finditer(text))
+    if matches and sections:
+        kept = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            if match.group(1).strip() in sections:
+                kept.append(match.group(1).strip() + ":\n" + text[match.end():end])
+        text = "\n".join(kept) or text
+
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+def truncate_to_tokens(text, max_tokens):
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = text.rfind(". ", 0, max_chars) + 1
+    return text[:cut if cut > 0 else max_chars].rstrip()
+
+# ================= RESEARCH CONTEXT =================
+def compact_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def compact_research(research, agent, max_tokens):
+    context = {k: research[k] for k in AGENT_FIELDS[agent] if research.get(k)}
+    base_tokens = estimate_tokens(compact_json(context))
+
+    instructions = condense_instructions(
+        research.get("writing_instructions") or "",
+        AGENT_INSTRUCTION_SECTIONS[agent]
+    )
+    room = max_tokens - base_tokens
+    if instructions and room >= MIN_RESEARCH_TOKENS // 2:
+        context["writing_instructions"] = truncate_to_tokens(instructions, room)
+
+    return compact_json(context)
+
+# ================= PROMPT ASSEMBLY =================
+# template.format(research=..., **parts). Token counts are measured per part;
+# only the research context is compacted to fit the agent's budget. The
+# article and other parts are never trimmed, so a prompt whose fixed parts
+# alone exceed the budget is sent as-is and only flagged (over_budget).
+# Counts and the saving against the old indented full-research dump are
+# recorded as span attributes.
+def build_prompt(agent, template, research, **parts):
+    with telemetry.span("prompt_budget", kind=agent) as span:
+        budget = AGENT_INPUT_BUDGETS[agent]
+        counts = {name: estimate_tokens(str(text)) for name, text in parts.items()}
+        counts["template"] = estimate_tokens(template)
+
+        room = max(budget - sum(counts.values()), MIN_RESEARCH_TOKENS)
+        context = compact_research(research, agent, room)
+        counts["research"] = estimate_tokens(context)
+
+        prompt = template.format(research=context, **parts)
+        total = sum(counts.values())
+        saved = estimate_tokens(json.dumps(research, indent=2)) - counts["research"]
+        span.set(
+            budget=budget,
+            input_tokens=total,
+            saved_tokens=saved,
+            over_budget=total > budget,
+            **{f"{k}_part_tokens": v for k, v in counts.items()}
+        )
+
+        if PROMPT_BUDGET_LOG:
+            detail = ", ".join(f"{k} {v}" for k, v in counts.items())
+            warning = " ⚠️ over budget" if total > budget else ""
+            print(f"🧮 {agent} prompt ~{total}/{budget} tokens ({detail}); saved ~{saved}{warning}")
+
+    return prompt
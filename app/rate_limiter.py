@@ -0,0 +1,185 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import contextvars
+from contextlib import contextmanager
+
+# ================= CONFIG =================
+# Per-minute budgets. GEMINI_RPM / GEMINI_TPM apply to every model without
+# its own entry in MODEL_LIMITS.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", 300))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", 1_000_000))
+MODEL_LIMITS = {
+    "gemini-2.5-flash": (GEMINI_RPM, GEMINI_TPM),
+}
+SERPAPI_RPM = int(os.getenv("SERPAPI_RPM", 60))
+
+BACKOFF_BASE = float(os.getenv("BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.getenv("BACKOFF_MAX", 60.0))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# ================= PRIORITY LANES =================
+# Lower runs first. The lane is carried in a context variable, so an entry
+# point sets it once and every LLM / SERP call underneath inherits it.
+INTERACTIVE, DEFAULT, BATCH = 0, 1, 2
+
+_lane = contextvars.ContextVar("rate_limit_lane", default=DEFAULT)
+
+@contextmanager
+def lane(priority):
+    token = _lane.set(priority)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+def current_lane():
+    return _lane.get()
+
+# ================= TOKEN BUCKET =================
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self.refill(now)
+        # A single request larger than the bucket only waits for a full one
+        need = min(amount, self.capacity)
+        return 0 if self.level >= need else (need - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+# ================= SCHEDULER =================
+# One limiter per upstream (Gemini model, SerpAPI). Callers queue by
+# (lane, arrival); only the head of the queue may take budget, so a burst of
+# batch work cannot starve interactive requests. A 429 puts the whole
+# limiter into a shared cooldown instead of every caller retrying on its own.
+class RateLimiter:
+    def __init__(self, name, rpm, tpm=None):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.cooldown_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._changed = None
+        self._loop = None
+
+    def _bind(self):
+        # asyncio primitives belong to one loop; the CLIs and tests may run
+        # several loops in one process
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queue = []
+            self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _delay(self, tokens):
+        now = time.monotonic()
+        delay = max(self.cooldown_until - now, self.requests.wait_time(1, now))
+        if self.tokens and tokens:
+            delay = max(delay, self.tokens.wait_time(tokens, now))
+        return delay
+
+    async def acquire(self, tokens=0, priority=None):
+        self._bind()
+        priority = current_lane() if priority is None else priority
+        entry = (priority, next(self._seq))
+        heapq.heappush(self._queue, entry)
+        self._notify()
+
+        try:
+            while True:
+                changed = self._changed
+                if self._queue[0] == entry:
+                    delay = self._delay(tokens)
+                    if delay <= 0:
+                        heapq.heappop(self._queue)
+                        self.requests.take(1)
+                        if self.tokens and tokens:
+                            self.tokens.take(tokens)
+                        self._notify()
+                        return
+                    try:
+                        await asyncio.wait_for(changed.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await changed.wait()
+        except BaseException:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._notify()
+            raise
+
+    # Charge (or refund) the difference once the real token usage is known
+    def settle(self, estimated, actual):
+        if self.tokens and actual:
+            self.tokens.take(actual - estimated)
+
+    def penalize(self, delay):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+
+_limiters = {}
+
+def get_limiter(name, rpm, tpm=None):
+    if name not in _limiters:
+        _limiters[name] = RateLimiter(name, rpm, tpm)
+    return _limiters[name]
+
+def for_model(model):
+    rpm, tpm = MODEL_LIMITS.get(model, (GEMINI_RPM, GEMINI_TPM))
+    return get_limiter(model, rpm, tpm)
+
+def for_serpapi():
+    return get_limiter("serpapi", SERPAPI_RPM)
+
+# ================= BACKOFF =================
+def error_status(error):
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+def retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+# Full jitter: a random delay up to the exponential cap, so callers that
+# failed together do not retry together.
+def backoff_delay(attempt, error=None):
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    hinted = retry_after(error) if error is not None else None
+    return max(delay, hinted) if hinted else delay
+
+def is_rate_limited(error):
+    return error_status(error) == 429
@@ -1,20 +1,38 @@
 import os
 import json
-import time
-import requests
-import google.generativeai as genai
-from pypdf import PdfReader
-from dotenv import load_dotenv
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pydantic import BaseModel
-from io import BytesIO
-
-# ================= ENV =================
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-SERP_API_KEY = os.getenv("SERP_API_KEY")
+import serp_client
+import rate_limiter
+import telemetry
+import structured_output
+from dag import Stage, run_dag
+from doc_summarizer import summarize_document
+# extract_text_from_* stay importable from here for existing callers
+from doc_parser import (
+    DOCUMENT_CHAR_BUDGET,
+    DOCUMENT_MAX_PAGES,
+    extract_text_from_file,
+    extract_text_from_pdf,
+    parse_document_job,
+    spool_to_path,
+)
+from llm_client import DEFAULT_MODEL
+from structured_output import (
+    TopicAnalysis,
+    SerpAnalysis,
+    ResearchBrief,
+    TopicAngles,
+)
+from workspace import Workspace, RESEARCH_FILE
 
 OUTPUT_DIR = "agent_outputs"
-RATE_LIMIT_WAIT = 20
+
+# Batch mode: at most this many SERP/LLM calls in flight per research run
+RESEARCH_CONCURRENCY = int(os.getenv("RESEARCH_CONCURRENCY", 5))
+MAX_BLOG_COUNT = 50
 
 # ================= MODELS =================
 class ResearchRequest(BaseModel):
@@ -23,93 +41,89 @@ class ResearchRequest(BaseModel):
     content_goal: str
     brand: str
     region: str
-
-# ================= SET OUTPUT PATH =================
-RESEARCH_OUTPUT_PATH = os.path.join(
-    os.path.dirname(__file__),
-    "agent_outputs",
-    "research_briefs.json"
-)
+    blog_count: int = 1
+    topics: list[str] = []
 
 # ================= GEMINI CONNECTOR =================
-def call_gemini(prompt, system_role, model="gemini-2.5-flash", temperature=0.3):
-    for attempt in range(5):
-        try:
-            model_obj = genai.GenerativeModel(
-                model_name=model,
-                system_instruction=system_role,
-            )
-            response = model_obj.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    top_p=0.95,
-                    top_k=40,
-                )
-            )
-            return response
-        except Exception as e:
-            if attempt < 4:
-                print(f"⏳ Gemini error: {e}. Retrying...")
-                time.sleep(RATE_LIMIT_WAIT)
-            else:
-                raise Exception("❌ Gemini failed after retries")
-
-# ================= JSON EXTRACTION HELPER =================
-def extract_json_from_response(content):
-    content = content.strip()
-    if content.startswith("```"):
-        lines = content.split("\n")
-        start_idx = 0
-        for i, line in enumerate(lines):
-            if line.strip().startswith("{") or line.strip().startswith("["):
-                start_idx = i
-                break
-        end_idx = len(lines)
-        for i in range(len(lines) - 1, -1, -1):
-            if lines[i].strip().endswith("}") or lines[i].strip().endswith("]"):
-                end_idx = i + 1
-                break
-        content = "\n".join(lines[start_idx:end_idx])
-    return content
-
-# ================= DOCUMENT INGESTION =================
-def extract_text_from_pdf(file_content):
-    reader = PdfReader(BytesIO(file_content))
-    return "\n".join(
-        page.extract_text()
-        for page in reader.pages
-        if page.extract_text()
+# Every research agent returns JSON: JSON mode + schema validation, with a
+# repair call on a malformed reply (see structured_output).
+async def generate_json(prompt, system_role, schema, model=DEFAULT_MODEL, temperature=0.3):
+    return await structured_output.generate_json(
+        prompt=prompt,
+        system_role=system_role,
+        schema=schema,
+        model=model,
+        temperature=temperature,
+        top_p=0.95,
+        top_k=40,
     )
 
-# ✅ FIXED: supports FastAPI UploadFile, bytes, or None
-def extract_text_from_file(file_content, filename: str | None):
+# ================= DOCUMENT INGESTION =================
+# PDF parsing is pure-Python and CPU-bound, so it runs in a bounded process
+# pool rather than on the event loop; throughput scales with cores and one
+# large upload cannot stall other requests.
+DOCUMENT_PARSE_WORKERS = int(os.getenv("DOCUMENT_PARSE_WORKERS", os.cpu_count() or 2))
+DOCUMENT_PARSE_TIMEOUT = float(os.getenv("DOCUMENT_PARSE_TIMEOUT", 60))
+
+_parse_pool = None
+
+def get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        # spawn: workers must not inherit the gRPC state of the API process
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=DOCUMENT_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _parse_pool
+
+async def extract_text_async(
+    file_content,
+    filename: str | None,
+    max_chars=DOCUMENT_CHAR_BUDGET,
+    max_pages=DOCUMENT_MAX_PAGES,
+    timeout=DOCUMENT_PARSE_TIMEOUT
+):
     if not file_content or not filename:
         return ""
 
-    filename = filename.lower()
-
-    if filename.endswith(".pdf"):
-        return extract_text_from_pdf(
-            file_content.read() if hasattr(file_content, "read") else file_content
-        )
-
-    if filename.endswith(".txt"):
-        content = file_content.read() if hasattr(file_content, "read") else file_content
-        return content.decode("utf-8", errors="ignore")
+    # Streams are spooled to a temp file so only a path crosses the process
+    # boundary; raw bytes are sent as-is.
+    spooled_path = None
+    source = file_content
+    if hasattr(file_content, "read"):
+        spooled_path = await asyncio.to_thread(spool_to_path, file_content)
+        source = spooled_path
 
-    return ""
+    try:
+        with telemetry.span("document_parse", kind=os.path.splitext(filename)[1].lower()) as span:
+            loop = asyncio.get_running_loop()
+            job = loop.run_in_executor(
+                get_parse_pool(),
+                parse_document_job,
+                source, filename, max_chars, max_pages, timeout,
+            )
+            # The worker stops itself at the deadline; this is only a backstop
+            text = await asyncio.wait_for(job, timeout + 10)
+            span.set(chars=len(text))
+            return text
+    except asyncio.TimeoutError:
+        raise Exception(f"❌ Document parsing timed out after {timeout}s: {filename}")
+    finally:
+        if spooled_path:
+            os.remove(spooled_path)
 
 # ================= SAVE RESEARCH OUTPUT =================
-def save_research_output(output: dict):
-    os.makedirs(os.path.dirname(RESEARCH_OUTPUT_PATH), exist_ok=True)
-
-    with open(RESEARCH_OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+# Each run writes into its own workspace (atomically), so concurrent runs
+# never overwrite each other's briefs.
+def save_research_output(output: dict | list, workspace: Workspace | None = None):
+    workspace = workspace or Workspace()
+    workspace.write_json(RESEARCH_FILE, output)
+    return workspace.run_id
 
 
 # ================= TOPIC UNDERSTANDING AGENT =================
-def extract_topic_with_llm(text):
+async def extract_topic_with_llm(text):
     prompt = f"""
 Analyze the document below and extract:
 1. Core topic
@@ -124,18 +138,16 @@ Return ONLY JSON:
 }}
 
 Document:
-{text[:3000]}
+{text}
 """
 
-    res = call_gemini(
-        prompt=prompt,
-        system_role="Topic analysis agent. JSON only.",
-        temperature=0.2
-    )
-
     try:
-        content = extract_json_from_response(res.text.strip())
-        return json.loads(content)
+        return await generate_json(
+            prompt=prompt,
+            system_role="Topic analysis agent. JSON only.",
+            schema=TopicAnalysis,
+            temperature=0.2
+        )
     except Exception:
         return {
             "core_topic": "Unknown topic",
@@ -144,18 +156,11 @@ Document:
         }
 
 # ================= SERP FETCH =================
-def fetch_serp(keyword):
-    url = "https://serpapi.com/search.json"
-    params = {
-        "engine": "google",
-        "q": keyword,
-        "num": 10,
-        "api_key": SERP_API_KEY
-    }
-    return requests.get(url, params=params).json()
+async def fetch_serp(keyword, region=None):
+    return await serp_client.fetch_serp_async(keyword, engine="google", num=10, region=region)
 
 # ================= SERP ANALYSIS AGENT =================
-def analyze_serp_with_llm(serp_data):
+async def analyze_serp_with_llm(serp_data):
     prompt = f"""
 Analyze the Google SERP data and return insights.
 
@@ -174,15 +179,13 @@ SERP DATA:
 {json.dumps(serp_data)[:6000]}
 """
 
-    res = call_gemini(
-        prompt=prompt,
-        system_role="SEO SERP research agent. JSON only.",
-        temperature=0.3
-    )
-
     try:
-        content = extract_json_from_response(res.text.strip())
-        return json.loads(content)
+        return await generate_json(
+            prompt=prompt,
+            system_role="SEO SERP research agent. JSON only.",
+            schema=SerpAnalysis,
+            temperature=0.3
+        )
     except Exception:
         return {
             "serp_type": "unknown",
@@ -195,7 +198,7 @@ SERP DATA:
         }
 
 # ================= FINAL RESEARCH BRIEF AGENT =================
-def generate_research_brief(context, serp_analysis):
+async def generate_research_brief(context, serp_analysis):
     prompt = f"""
 You are an SEO research agent.
 
@@ -251,33 +254,135 @@ SERP Analysis:
 """
 
 
-    res = call_gemini(
+    # Validated against ResearchBrief; a malformed reply gets one repair
+    # call instead of failing the run after all the SERP and LLM spend.
+    return await generate_json(
         prompt=prompt,
         system_role="SEO research agent. Output strict JSON only.",
+        schema=ResearchBrief,
         temperature=0.2
     )
 
-    content = extract_json_from_response(res.text.strip())
-    data = json.loads(content)
+# ================= TOPIC ANGLE AGENT =================
+async def derive_topic_angles(request_data: ResearchRequest, count):
+    prompt = f"""
+Suggest {count} distinct blog post topics for one content campaign.
 
-    return {
-        "primary_keyword": data.get("primary_keyword", ""),
-        "secondary_keywords": data.get("secondary_keywords", []),
-        "question_keywords": data.get("question_keywords", []),
-        "content_angle": data.get("content_angle", ""),
-        "ranking_feasibility": data.get("ranking_feasibility", ""),
-        "writing_instructions": data.get("writing_instructions", "")
-    }
+Campaign topic: {request_data.topic}
+Target audience: {request_data.target_audience}
+Content goal: {request_data.content_goal}
+Region: {request_data.region}
 
-# ================= MAIN RESEARCH AGENT FUNCTION =================
-async def run_research_agent(
-    request_data: ResearchRequest,
+Each topic must cover a different angle or question and work as a
+standalone search query.
+
+Return ONLY JSON:
+{{
+  "topics": []
+}}
+"""
+
+    try:
+        angles = await generate_json(
+            prompt=prompt,
+            system_role="Content strategy agent. JSON only.",
+            schema=TopicAngles,
+            temperature=0.7
+        )
+        topics = [t.strip() for t in angles["topics"] if t.strip()]
+    except Exception as e:
+        print(f"⚠️ Topic angles unusable: {e}")
+        topics = []
+
+    # Never padded: a failed or short reply yields fewer, distinct topics
+    return list(dict.fromkeys([request_data.topic] + topics))[:count]
+
+# ================= RESEARCH STAGE GRAPH =================
+# document → document_topic and serp → serp_analysis are independent chains,
+# so the upload is parsed and understood while the SERP round trip is in
+# flight. Each brief waits for both. In batch mode the document is parsed once
+# and shared, identical SERP queries are fetched and analysed once, and
+# every network stage is gated by the shared `limiter`.
+def serp_query_key(context):
+    return (context["topic"].strip().lower(), context["region"].strip().lower())
+
+def build_research_stages(
+    contexts,
     file_content=None,
-    filename: str | None = None,
-    suggestion: str | None = None
+    filename=None,
+    limiter=None,
+    workspace=None
 ):
-    context = {
-        "topic": request_data.topic,
+    limiter = limiter or asyncio.Semaphore(RESEARCH_CONCURRENCY)
+
+    async def document():
+        return await extract_text_async(file_content, filename)
+
+    async def document_summary(document):
+        return await summarize_document(document)
+
+    async def document_topic(document_summary):
+        if not document_summary:
+            return None
+        async with limiter:
+            return await extract_topic_with_llm(document_summary)
+
+    stages = [
+        Stage("document", document),
+        Stage("document_summary", document_summary, deps=["document"]),
+        Stage("document_topic", document_topic, deps=["document_summary"]),
+    ]
+
+    serp_stage_names = {}
+    for context in contexts:
+        key = serp_query_key(context)
+        if key in serp_stage_names:
+            continue
+        n = len(serp_stage_names)
+        serp_stage_names[key] = f"serp_analysis_{n}"
+
+        async def serp(context=context):
+            async with limiter:
+                return await fetch_serp(context["topic"], context["region"])
+
+        async def serp_analysis(serp_name=f"serp_{n}", **deps):
+            async with limiter:
+                return await analyze_serp_with_llm(deps[serp_name])
+
+        stages.append(Stage(f"serp_{n}", serp))
+        stages.append(Stage(f"serp_analysis_{n}", serp_analysis, deps=[f"serp_{n}"]))
+
+    brief_names = []
+    for i, context in enumerate(contexts):
+        analysis_name = serp_stage_names[serp_query_key(context)]
+
+        async def brief(context=context, analysis_name=analysis_name, **deps):
+            brief_context = {**context, "document_text": deps["document_summary"]}
+            if deps["document_topic"]:
+                brief_context["document_topic"] = deps["document_topic"]
+            async with limiter:
+                return await generate_research_brief(brief_context, deps[analysis_name])
+
+        brief_names.append(f"brief_{i}")
+        stages.append(Stage(
+            f"brief_{i}",
+            brief,
+            deps=["document_summary", "document_topic", analysis_name]
+        ))
+
+    # One write for the whole run: a single brief keeps the original object
+    # format, a batch is saved as a list.
+    def save(**deps):
+        briefs = [deps[name] for name in brief_names]
+        save_research_output(briefs[0] if len(briefs) == 1 else briefs, workspace)
+        return briefs
+
+    stages.append(Stage("save", save, deps=brief_names))
+    return stages
+
+def build_context(request_data: ResearchRequest, topic, suggestion=None):
+    return {
+        "topic": topic,
         "target_audience": request_data.target_audience,
         "content_goal": request_data.content_goal,
         "brand": request_data.brand,
@@ -285,12 +390,77 @@ async def run_research_agent(
 
         # NEW INPUTS (SAFE)
         "user_suggestion": suggestion or "",
-        "document_text": extract_text_from_file(file_content, filename)[:3000]
     }
 
-    serp_data = fetch_serp(context["topic"])
-    serp_analysis = analyze_serp_with_llm(serp_data)
+# ================= MAIN RESEARCH AGENT FUNCTION =================
+async def run_research_agent(
+    request_data: ResearchRequest,
+    file_content=None,
+    filename: str | None = None,
+    suggestion: str | None = None,
+    on_stage=None,
+    run_id: str | None = None
+):
+    if request_data.topics or request_data.blog_count > 1:
+        return await run_research_batch(
+            request_data, file_content, filename, suggestion, on_stage, run_id
+        )
+
+    workspace = Workspace(run_id)
+    context = build_context(request_data, request_data.topic, suggestion)
+
+    results, timings = await run_dag(
+        build_research_stages([context], file_content, filename, workspace=workspace),
+        on_stage=on_stage
+    )
+    print(f"⏱️ Research stage timings: {timings}")
 
-    output = generate_research_brief(context, serp_analysis)
-    save_research_output(output)
-    return output
\ No newline at end of file
+    output = results["save"][0]
+    return {**output, "run_id": workspace.run_id, "stage_timings": timings}
+
+# ================= BATCH RESEARCH =================
+# Produces one brief per topic. Topics come from request_data.topics, or are
+# derived from request_data.topic when only blog_count is given.
+async def run_research_batch(
+    request_data: ResearchRequest,
+    file_content=None,
+    filename: str | None = None,
+    suggestion: str | None = None,
+    on_stage=None,
+    run_id: str | None = None
+):
+    # Batch work queues behind interactive requests at the rate limiter
+    topics = [t.strip() for t in request_data.topics if t.strip()]
+    warning = None
+    if not topics:
+        count = min(max(request_data.blog_count, 1), MAX_BLOG_COUNT)
+        with rate_limiter.lane(rate_limiter.BATCH):
+            topics = await derive_topic_angles(request_data, count)
+        if len(topics) < count:
+            warning = f"Only {len(topics)} distinct topics could be derived; {count} were requested"
+            print(f"⚠️ {warning}")
+    topics = topics[:MAX_BLOG_COUNT]
+
+    workspace = Workspace(run_id)
+    contexts = [build_context(request_data, topic, suggestion) for topic in topics]
+
+    with rate_limiter.lane(rate_limiter.BATCH):
+        results, timings = await run_dag(
+            build_research_stages(contexts, file_content, filename, workspace=workspace),
+            on_stage=on_stage
+        )
+    print(f"⏱️ Batch research timings: {timings['total']} for {len(topics)} briefs")
+
+    # The first brief stays at the top level, so clients that render a single
+    # brief keep working; the full batch is under "briefs".
+    output = {
+        **results["save"][0],
+        "status": "success",
+        "run_id": workspace.run_id,
+        "topics": topics,
+        "briefs": results["save"],
+        "stage_timings": timings,
+    }
+    if warning:
+        output["warning"] = warning
+    return output
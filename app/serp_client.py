@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import requests
+from requests.adapters import HTTPAdapter
+import rate_limiter
+import telemetry
+from llm_cache import LLMCache, make_key
+
+# ================= CONFIG =================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SERP_API_URL = "https://serpapi.com/search.json"
+SERP_TIMEOUT = float(os.getenv("SERP_TIMEOUT", 15))
+SERP_POOL_SIZE = int(os.getenv("SERP_POOL_SIZE", 10))
+SERP_MAX_RETRIES = 4
+
+# Results younger than this are served from disk instead of SerpAPI
+SERP_CACHE_TTL = int(os.getenv("SERP_CACHE_TTL", 6 * 3600))
+SERP_CACHE_ENABLED = os.getenv("SERP_CACHE_ENABLED", "1") != "0"
+SERP_CACHE_PATH = os.getenv(
+    "SERP_CACHE_PATH",
+    os.path.join(BASE_DIR, "cache", "serp_cache.sqlite3")
+)
+
+# SERP_MODE=stub answers from local fixtures instead of the network
+SERP_MODE = os.getenv("SERP_MODE", "live")
+SERP_FIXTURE_DIR = os.getenv(
+    "SERP_FIXTURE_DIR",
+    os.path.join(BASE_DIR, "fixtures", "serp")
+)
+# Stub latency (seconds) and injected 429/5xx rate, for benchmarks
+SERP_STUB_LATENCY = float(os.getenv("SERP_STUB_LATENCY", 0))
+SERP_STUB_FAILURE_RATE = float(os.getenv("SERP_STUB_FAILURE_RATE", 0))
+
+# ================= HTTP SESSION =================
+# One keep-alive pool for every SerpAPI request, so repeat runs reuse the
+# TLS connection instead of handshaking each time.
+_session = None
+
+def get_session():
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=SERP_POOL_SIZE,
+            pool_maxsize=SERP_POOL_SIZE,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+# ================= SERP CACHE =================
+# Same SQLite store as the LLM cache, kept in its own file with a shorter
+# freshness window.
+serp_cache = LLMCache(
+    path=SERP_CACHE_PATH,
+    ttl=SERP_CACHE_TTL,
+    enabled=SERP_CACHE_ENABLED,
+)
+
+def serp_cache_key(query, engine, num, region):
+    return make_key(engine, region, query, {"num": num})
+
+# ================= FETCHERS =================
+def _fixture_name(query):
+    return re.sub(r"[^a-z0-9]+", "_", query.lower()).strip("_") + ".json"
+
+def stub_failure():
+    response = requests.Response()
+    response.status_code = random.choice((429, 500, 503))
+    return requests.HTTPError(f"stub SerpAPI error {response.status_code}", response=response)
+
+def fetch_serp_stub(query, engine="google", num=10, region=None):
+    if SERP_STUB_LATENCY:
+        time.sleep(SERP_STUB_LATENCY * random.uniform(0.75, 1.25))
+    if random.random() < SERP_STUB_FAILURE_RATE:
+        raise stub_failure()
+
+    path = os.path.join(SERP_FIXTURE_DIR, _fixture_name(query))
+    if not os.path.exists(path):
+        path = os.path.join(SERP_FIXTURE_DIR, "default.json")
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    data.setdefault("search_parameters", {}).update({
+        "engine": engine,
+        "q": query,
+        "num": num,
+        "location": region,
+    })
+    return data
+
+def fetch_serp_live(query, engine="google", num=10, region=None):
+    params = {
+        "engine": engine,
+        "q": query,
+        "num": num,
+        "api_key": os.getenv("SERP_API_KEY"),
+    }
+    if region:
+        params["location"] = region
+
+    response = get_session().get(SERP_API_URL, params=params, timeout=SERP_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+# ================= ASYNC FETCH =================
+# Used by the research pipeline. Cache hits skip the scheduler; every fetch
+# (stub included, so benchmarks exercise the same path) takes a SerpAPI slot
+# in the caller's priority lane and retries 429 / 5xx / network errors with
+# jittered exponential backoff.
+def is_retryable(error):
+    return rate_limiter.is_retryable(error) or isinstance(
+        error, (requests.ConnectionError, requests.Timeout)
+    )
+
+async def fetch_serp_async(query, engine="google", num=10, region=None, use_cache=True):
+    with telemetry.span("serp_fetch", kind=SERP_MODE) as span:
+        use_cache = use_cache and serp_cache.enabled
+        key = serp_cache_key(query, engine, num, region)
+
+        if use_cache:
+            cached = await asyncio.to_thread(serp_cache.get, key)
+            span.set(cache_hit=cached is not None)
+            if cached is not None:
+                return json.loads(cached)
+
+        fetcher = fetch_serp_stub if SERP_MODE == "stub" else fetch_serp_live
+        limiter = rate_limiter.for_serpapi()
+        for attempt in range(SERP_MAX_RETRIES):
+            span.set(retries=attempt)
+            await limiter.acquire()
+            try:
+                data = await asyncio.to_thread(fetcher, query, engine, num, region)
+                break
+            except Exception as e:
+                if not is_retryable(e) or attempt >= SERP_MAX_RETRIES - 1:
+                    raise
+                delay = rate_limiter.backoff_delay(attempt, e)
+                print(f"⏳ SerpAPI error: {e}. Retrying in {delay:.1f}s...")
+                if rate_limiter.is_rate_limited(e):
+                    limiter.penalize(delay)
+                else:
+                    await asyncio.sleep(delay)
+
+        if use_cache and "error" not in data:
+            await asyncio.to_thread(serp_cache.set, key, json.dumps(data, ensure_ascii=False))
+        return data
@@ -0,0 +1,189 @@
+import json
+from pydantic import BaseModel, Field, ValidationError
+import llm_client
+
+# ================= CONFIG =================
+JSON_MIME_TYPE = "application/json"
+REPAIR_SYSTEM_ROLE = "JSON repair agent. Output strict JSON only."
+REPAIR_SNIPPET_CHARS = 12000
+
+# ================= SCHEMAS =================
+# One schema per agent output. Unknown fields are ignored; missing lists and
+# strings default to empty so a terse but valid reply is never "repaired".
+class TopicAnalysis(BaseModel):
+    core_topic: str
+    target_audience: str = ""
+    search_intent: str = "informational"
+
+class SerpAnalysis(BaseModel):
+    serp_type: str = "unknown"
+    serp_features: list = Field(default_factory=list)
+    top_domains: list = Field(default_factory=list)
+    competitor_strengths: list = Field(default_factory=list)
+    competitor_weaknesses: list = Field(default_factory=list)
+    keyword_difficulty: str = "medium"
+    ranking_probability: str = "moderate"
+
+class ResearchBrief(BaseModel):
+    primary_keyword: str
+    secondary_keywords: list[str] = Field(default_factory=list)
+    question_keywords: list[str] = Field(default_factory=list)
+    content_angle: str = ""
+    ranking_feasibility: str = ""
+    writing_instructions: str = ""
+
+class TopicAngles(BaseModel):
+    topics: list[str]
+
+class ChunkSummaries(BaseModel):
+    summaries: list[str]
+
+class ScoreBreakdown(BaseModel):
+    tone: float
+    audience: float
+    keywords: float
+    clarity: float
+    consistency: float
+
+class BrandScore(BaseModel):
+    overall_score: float = Field(ge=0, le=100)
+    breakdown: ScoreBreakdown
+    issues: list[str] = Field(default_factory=list)
+
+# ================= TOLERANT SCANNER =================
+# One pass over the reply: skip anything before the first { or [ (code
+# fences, prose), track strings and nesting, drop trailing commas, stop at the
+# matching close. A reply cut off mid-object is closed off so a truncated
+# answer still parses as far as it got; a key cut off before its value is
+# dropped.
+def scan_json(text):
+    if not text:
+        raise ValueError("Empty response from model")
+
+    out = []
+    stack = []
+    in_string = escaped = False
+    string_start = None
+
+    for ch in text:
+        if not stack:
+            if ch in "{[":
+                stack.append("}" if ch == "{" else "]")
+                out.append(ch)
+            continue
+
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+            string_start = len(out)
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            continue
+        out.append(ch)
+
+    if not out:
+        raise ValueError("No JSON object found in response")
+
+    if stack:
+        if in_string:
+            out.append('"')
+        while out and out[-1] in " \t\r\n,:":
+            out.pop()
+        if stack[-1] == "}" and out and out[-1] == '"' and is_key(out, string_start):
+            del out[string_start:]
+            while out and out[-1] in " \t\r\n,":
+                out.pop()
+        out.extend(reversed(stack))
+
+    return json.loads("".join(out))
+
+# A string directly after { or , inside an object is a key, not a value
+def is_key(out, start):
+    i = start - 1
+    while i >= 0 and out[i] in " \t\r\n":
+        i -= 1
+    return i >= 0 and out[i] in "{,"
+
+def parse_model(text, schema):
+    return schema.model_validate(scan_json(text)).model_dump()
+
+# ================= STRUCTURED CALL =================
+# JSON mode on the first call; if the reply still does not validate, one
+# cheap repair call (temperature 0, the broken reply plus the validation
+# error) replaces re-running the stage.
+async def generate_json(
+    prompt,
+    system_role,
+    schema,
+    model=llm_client.DEFAULT_MODEL,
+    temperature=0.2,
+    repair=True,
+    **generation_config
+):
+    text = await llm_client.call_gemini(
+        prompt=prompt,
+        system_role=system_role,
+        model=model,
+        temperature=temperature,
+        response_mime_type=JSON_MIME_TYPE,
+        **generation_config
+    )
+
+    try:
+        return parse_model(text, schema)
+    except (ValueError, ValidationError) as e:
+        if not repair:
+            raise Exception(f"❌ Invalid {schema.__name__} JSON from model: {e}") from e
+        error = e
+
+    print(f"🩹 Repairing {schema.__name__} JSON: {str(error).splitlines()[0]}")
+    fixed = await llm_client.call_gemini(
+        prompt=build_repair_prompt(text, schema, error),
+        system_role=REPAIR_SYSTEM_ROLE,
+        model=model,
+        temperature=0,
+        response_mime_type=JSON_MIME_TYPE,
+    )
+
+    try:
+        return parse_model(fixed, schema)
+    except (ValueError, ValidationError) as e:
+        snippet = (text or "")[:1000].replace("\n", " ")
+        raise Exception(
+            f"❌ Invalid {schema.__name__} JSON from model after repair: {e}. "
+            f"Response snippet: {snippet}"
+        ) from e
+
+def build_repair_prompt(text, schema, error):
+    return f"""
+The JSON below does not match the required schema.
+
+Validation error:
+{error}
+
+Required JSON schema:
+{json.dumps(schema.model_json_schema(), separators=(",", ":"))}
+
+Broken JSON:
+{(text or "")[:REPAIR_SNIPPET_CHARS]}
+
+Return ONLY the corrected JSON. Keep every value that is already valid.
+"""
@@ -0,0 +1,151 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+
+# ================= CONFIG =================
+# LLM_MODE=stub swaps every Gemini model handle for StubModel: no network,
+# canned answers seeded from the checked-in outputs, and configurable
+# latency / failure injection for benchmarks.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", 0.2))
+STUB_LLM_JITTER = float(os.getenv("STUB_LLM_JITTER", 0.25))
+STUB_LLM_TOKENS_PER_SEC = float(os.getenv("STUB_LLM_TOKENS_PER_SEC", 2000))
+STUB_LLM_FAILURE_RATE = float(os.getenv("STUB_LLM_FAILURE_RATE", 0))
+STUB_LLM_MALFORMED_RATE = float(os.getenv("STUB_LLM_MALFORMED_RATE", 0))
+STUB_STREAM_CHUNK_CHARS = 200
+
+SEED_RESEARCH_PATH = os.path.join(BASE_DIR, "agent_outputs", "research_briefs.json")
+SEED_ARTICLE_PATH = os.path.join(BASE_DIR, "outputs", "article.md")
+
+# ================= SEED DATA =================
+def load_seed_brief():
+    with open(SEED_RESEARCH_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data[0] if isinstance(data, list) else data
+
+def load_seed_article():
+    with open(SEED_ARTICLE_PATH, "r", encoding="utf-8") as f:
+        return f.read()
+
+SEED_BRIEF = load_seed_brief()
+SEED_ARTICLE = load_seed_article()
+
+# ================= RESPONSES =================
+class StubAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"stub upstream error {code}")
+        self.code = code
+
+class StubUsage:
+    def __init__(self, prompt_tokens, response_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = response_tokens
+        self.total_token_count = prompt_tokens + response_tokens
+
+class StubResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = StubUsage(len(prompt) // 4, len(text) // 4)
+
+def stable_score(prompt):
+    # Same prompt → same score, so cached and uncached runs agree
+    return 60 + int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % 30
+
+# Routed on the schema keys each agent's prompt asks for. Order matters:
+# later prompts embed earlier agents' JSON (the brief prompt carries the
+# SERP analysis and document topic, the score prompt carries the brief).
+def json_reply(prompt):
+    if "overall_score" in prompt:
+        score = stable_score(prompt)
+        return {
+            "overall_score": score,
+            "breakdown": {dim: score for dim in ("tone", "audience", "keywords", "clarity", "consistency")},
+            "issues": ["Tighten the introduction", "Use the primary keyword in a heading"],
+        }
+    if '"summaries"' in prompt:
+        count = max(prompt.count("### CHUNK"), 1)
+        return {"summaries": [f"- Key points of chunk {i + 1}" for i in range(count)]}
+    if "writing_instructions" in prompt:
+        return SEED_BRIEF
+    if "serp_type" in prompt:
+        return {
+            "serp_type": "informational",
+            "serp_features": ["people_also_ask"],
+            "top_domains": ["example-edu.org"],
+            "competitor_strengths": ["clear definitions"],
+            "competitor_weaknesses": ["few examples"],
+            "keyword_difficulty": "medium",
+            "ranking_probability": "moderate",
+        }
+    if "core_topic" in prompt:
+        return {"core_topic": SEED_BRIEF.get("primary_keyword", ""), "target_audience": "parents", "search_intent": "informational"}
+    if '"topics"' in prompt:
+        return {"topics": [f"{SEED_BRIEF.get('primary_keyword', 'Topic')} angle {i}" for i in range(1, 60)]}
+    return SEED_BRIEF
+
+def section_reply(prompt):
+    # The sectioned writer marks its section with → in the outline
+    for line in prompt.splitlines():
+        if line.startswith("→"):
+            title = line[1:].strip()
+            return f"**{title.upper()}**\n\n" + SEED_ARTICLE[:1200]
+    return SEED_ARTICLE[:1200]
+
+def text_reply(prompt, system_instruction):
+    if "ONE section" in system_instruction:
+        return section_reply(prompt)
+    if "Summarize" in prompt or "summar" in system_instruction.lower():
+        return "- Merged summary of the uploaded document"
+    return SEED_ARTICLE
+
+# ================= MODEL =================
+class StubModel:
+    def __init__(self, model_name=None, system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction or ""
+
+    def reply(self, prompt, generation_config):
+        mime = getattr(generation_config, "response_mime_type", None)
+        if mime == "application/json":
+            text = json.dumps(json_reply(prompt), ensure_ascii=False)
+            if random.random() < STUB_LLM_MALFORMED_RATE:
+                text = text[: len(text) // 2]
+            return text
+        return text_reply(prompt, self.system_instruction)
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False, **kwargs):
+        prompt = str(prompt)
+        text = self.reply(prompt, generation_config)
+
+        if stream:
+            return StubStream(text, prompt)
+
+        await stub_latency(text)
+        maybe_fail()
+        return StubResponse(text, prompt)
+
+# Time to first chunk is the base latency; the rest arrives at the
+# configured token rate.
+class StubStream:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = StubUsage(len(prompt) // 4, len(text) // 4)
+
+    async def __aiter__(self):
+        maybe_fail()
+        await stub_latency("")
+        for i in range(0, len(self.text), STUB_STREAM_CHUNK_CHARS):
+            chunk = self.text[i:i + STUB_STREAM_CHUNK_CHARS]
+            await asyncio.sleep((len(chunk) / 4) / STUB_LLM_TOKENS_PER_SEC)
+            yield StubResponse(chunk, "")
+
+async def stub_latency(text):
+    base = STUB_LLM_LATENCY * random.uniform(1 - STUB_LLM_JITTER, 1 + STUB_LLM_JITTER)
+    await asyncio.sleep(base + (len(text) / 4) / STUB_LLM_TOKENS_PER_SEC)
+
+def maybe_fail():
+    if random.random() < STUB_LLM_FAILURE_RATE:
+        raise StubAPIError(random.choice((429, 500, 503)))
@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from collections import deque
+
+# ================= CONFIG =================
+# TELEMETRY=0 turns every span into a shared no-op object: no clock reads,
+# no locking, nothing recorded.
+TELEMETRY_ENABLED = os.getenv("TELEMETRY", "1") != "0"
+# TELEMETRY_LOG=1 also prints one JSON line per finished span
+TELEMETRY_LOG = os.getenv("TELEMETRY_LOG", "0") == "1"
+RECENT_SPANS = 500
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# ================= REGISTRY =================
+# Counters and histograms keyed by (metric name, sorted label pairs),
+# rendered in the Prometheus text exposition format.
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+
+    def inc(self, name, value=1, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.help.setdefault(name, ("counter", help))
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, help="", buckets=DURATION_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.help.setdefault(name, ("histogram", help))
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {
+                    "buckets": buckets,
+                    "counts": [0] * len(buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            i = bisect.bisect_left(hist["buckets"], value)
+            if i < len(hist["counts"]):
+                hist["counts"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {k: {**v, "counts": list(v["counts"])} for k, v in self.histograms.items()}
+            help = dict(self.help)
+
+        for name in sorted(help):
+            kind, text = help[name]
+            lines.append(f"# HELP {name} {text or name}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+                continue
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(hist["buckets"], hist["counts"]):
+                    cumulative += count
+                    le = format_labels(labels + (("le", repr(float(bound))),))
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {hist['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {hist['sum']:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in labels) + "}"
+
+registry = Registry()
+recent_spans = deque(maxlen=RECENT_SPANS)
+
+# ================= SPANS =================
+# A span times one unit of work (a stage, an LLM call, a SERP fetch, a file
+# write) and carries attributes. Well-known attributes feed the metrics:
+# prompt_tokens / response_tokens, retries, cache_hit, bytes, error.
+# Parent/child links follow contextvars, so spans opened inside asyncio
+# tasks or to_thread calls nest under the span that started them.
+_current = contextvars.ContextVar("telemetry_span", default=None)
+
+# Labels kept on metrics; everything else stays on the span record only
+METRIC_LABELS = ("model", "stage", "kind", "route", "status")
+
+class Span:
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start", "_token")
+
+    def __init__(self, name, attrs):
+        parent = _current.get()
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Closed from another context (e.g. an async generator finished
+            # by a different task); the link only matters for new children
+            pass
+        if exc_type is not None:
+            self.attrs.setdefault("error", exc_type.__name__)
+        record_span(self, duration)
+        return False
+
+class NoopSpan:
+    def set(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = NoopSpan()
+
+def span(name, **attrs):
+    if not TELEMETRY_ENABLED:
+        return NOOP_SPAN
+    return Span(name, attrs)
+
+def stage_label(name):
+    # serp_3 / brief_12 → serp / brief, keeping label cardinality bounded
+    return re.sub(r"_\d+$", "", name)
+
+def record_span(s, duration):
+    attrs = s.attrs
+    labels = {"span": s.name}
+    labels.update({k: attrs[k] for k in METRIC_LABELS if attrs.get(k) is not None})
+
+    registry.observe("span_duration_seconds", duration, "Span duration in seconds", **labels)
+    if attrs.get("error"):
+        registry.inc("span_errors_total", 1, "Spans that ended with an error", **labels)
+    if attrs.get("retries"):
+        registry.inc("span_retries_total", attrs["retries"], "Retries inside spans", **labels)
+    if "cache_hit" in attrs:
+        registry.inc(
+            "cache_requests_total", 1, "Cache lookups by result",
+            span=s.name, result="hit" if attrs["cache_hit"] else "miss"
+        )
+    for kind in ("prompt", "response"):
+        tokens = attrs.get(f"{kind}_tokens")
+        if tokens:
+            registry.inc(
+                "llm_tokens_total", tokens, "LLM tokens by direction",
+                model=attrs.get("model", ""), direction=kind
+            )
+    if attrs.get("bytes"):
+        registry.inc("io_bytes_total", attrs["bytes"], "Bytes read or written", span=s.name)
+
+    record = {
+        "name": s.name,
+        "trace_id": s.trace_id,
+        "span_id": s.span_id,
+        "parent_id": s.parent_id,
+        "duration": round(duration, 6),
+        **attrs,
+    }
+    recent_spans.append(record)
+    if TELEMETRY_LOG:
+        print(json.dumps(record, default=str))
+
+# ================= EXPORT =================
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def render_metrics():
+    if not TELEMETRY_ENABLED:
+        return "# telemetry disabled\n"
+    return registry.render()
@@ -0,0 +1,127 @@
+import os
+import json
+import uuid
+import asyncio
+import tempfile
+import telemetry
+from artifact_store import artifact_index
+
+# ================= PATHS =================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNS_DIR = os.getenv("RUNS_DIR", os.path.join(BASE_DIR, "runs"))
+
+RESEARCH_FILE = "research_briefs.json"
+ARTICLE_FILE = "article.md"
+BRANDED_FILE = "article_branded.md"
+SAVED_OUTPUT_FILE = "output.md"
+SECTIONS_FILE = "article_sections.json"
+
+# The pre-workspace global files. They are still refreshed (atomically) with
+# the latest result so the CLI agents and the Next.js routes that read them
+# keep working, but no run ever reads another run's state from them.
+LEGACY_PATHS = {
+    RESEARCH_FILE: os.path.join(BASE_DIR, "agent_outputs", "research_briefs.json"),
+    ARTICLE_FILE: os.path.join(BASE_DIR, "outputs", "article.md"),
+    BRANDED_FILE: os.path.join(BASE_DIR, "outputs", "article_branded.md"),
+    SAVED_OUTPUT_FILE: os.path.join(BASE_DIR, "agent_outputs", "output.md"),
+}
+# PUBLISH_LATEST=0 keeps runs inside their workspace (benchmarks, tests)
+PUBLISH_LATEST = os.getenv("PUBLISH_LATEST", "1") != "0"
+
+# ================= ATOMIC WRITES =================
+# Write to a temp file in the target directory, then rename over the target:
+# readers see either the old or the new file, never a partial one.
+def atomic_write_text(path, text):
+    with telemetry.span("file_write", bytes=len(text)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+def atomic_write_json(path, data):
+    atomic_write_text(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+def read_file(path):
+    with telemetry.span("file_read") as span:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        span.set(bytes=len(text))
+        return text
+
+def publish_latest(name, text):
+    if PUBLISH_LATEST:
+        atomic_write_text(LEGACY_PATHS[name], text)
+
+# ================= RUN WORKSPACE =================
+def new_run_id():
+    return uuid.uuid4().hex
+
+def is_valid_run_id(run_id):
+    return bool(run_id) and len(run_id) == 32 and all(c in "0123456789abcdef" for c in run_id)
+
+class Workspace:
+    def __init__(self, run_id=None):
+        run_id = run_id or new_run_id()
+        if not is_valid_run_id(run_id):
+            raise ValueError(f"❌ Invalid run id: {run_id}")
+        self.run_id = run_id
+        self.dir = os.path.join(RUNS_DIR, run_id)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def write_text(self, name, text, publish=True, score=None):
+        path = self.path(name)
+        atomic_write_text(path, text)
+        artifact_index.record(path, text, run_id=self.run_id, name=name, score=score)
+        if publish and name in LEGACY_PATHS:
+            publish_latest(name, text)
+        return path
+
+    def write_json(self, name, data, publish=True, score=None):
+        return self.write_text(
+            name,
+            json.dumps(data, indent=2, ensure_ascii=False),
+            publish,
+            score
+        )
+
+    # For coroutines: the fsync and the artifact-index commit run in a worker
+    # thread instead of blocking the event loop
+    async def write_text_async(self, name, text, publish=True, score=None):
+        return await asyncio.to_thread(self.write_text, name, text, publish, score)
+
+    async def write_json_async(self, name, data, publish=True, score=None):
+        return await asyncio.to_thread(self.write_json, name, data, publish, score)
+
+    def read_text(self, name):
+        path = self.path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Missing file for run {self.run_id}: {name}")
+        return read_file(path)
+
+    def read_json(self, name):
+        return json.loads(self.read_text(name))
+
+# ================= LOOKUP =================
+# With a run id, read that run's artifact; without one, fall back to the
+# legacy "latest" file (old clients and the CLI).
+def read_artifact(name, run_id=None):
+    if run_id:
+        return Workspace(run_id).read_text(name)
+
+    path = LEGACY_PATHS[name]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ Missing file: {path}")
+    return read_file(path)
@@ -23,8 +23,12 @@ export default function WritingPage() {
         setMessage("");
 
         try {
-            // 🔹 STEP 1: Fetch research agent output
-            const briefRes = await fetch("/api/research-agent", { method: "GET" });
+            // 🔹 STEP 1: Fetch research agent output (this run's, when known)
+            const runId = sessionStorage.getItem("run_id");
+            const briefUrl = runId
+                ? `/api/research-agent?run_id=${encodeURIComponent(runId)}`
+                : "/api/research-agent";
+            const briefRes = await fetch(briefUrl, { method: "GET" });
 
             if (!briefRes.ok) {
                 throw new Error("Failed to fetch research agent");
@@ -36,7 +40,9 @@ export default function WritingPage() {
             // 🔥 UNIVERSAL RESEARCH EXTRACTION
             let briefObject = null;
 
-            if (Array.isArray(briefData?.research_briefs)) {
+            if (briefData?.research_briefs && !Array.isArray(briefData.research_briefs)) {
+                briefObject = briefData.research_briefs;
+            } else if (Array.isArray(briefData?.research_briefs)) {
                 briefObject = briefData.research_briefs[0];
             } else if (briefData?.brief) {
                 briefObject = briefData.brief;
@@ -53,6 +59,9 @@ export default function WritingPage() {
             // 🔹 STEP 2: Send research → writing agent
             const formData = new FormData();
             formData.append("brief", JSON.stringify(briefObject));
+            if (runId) {
+                formData.append("run_id", runId);
+            }
 
             const suggestionToSend = suggestionText ?? suggestion;
             if (suggestionToSend) {
@@ -82,6 +91,9 @@ export default function WritingPage() {
             if (data?.article) {
                 setArticle(data.article);
             }
+            if (data?.run_id) {
+                sessionStorage.setItem("run_id", data.run_id);
+            }
 
             setMetadata({
                 topic: data?.topic || "",
@@ -1,37 +1,29 @@
 import os
 import json
-import time
-import re
-from dotenv import load_dotenv
-import google.generativeai as genai
+import asyncio
+import llm_client
+from workspace import (
+    Workspace,
+    ARTICLE_FILE,
+    RESEARCH_FILE,
+    SECTIONS_FILE,
+    read_artifact,
+)
 
 # ================= ENV =================
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+llm_client.require_api_key()
 
-if not GEMINI_API_KEY:
-    raise Exception("❌ GEMINI_API_KEY not set")
-
-genai.configure(api_key=GEMINI_API_KEY)
-
-# ================= PATH CONFIG =================
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-RESEARCH_JSON_PATH = os.path.join(BASE_DIR, "agent_outputs", "research_briefs.json")
-OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
+# ================= SECTION CONFIG =================
+SECTION_WRITE_CONCURRENCY = int(os.getenv("SECTION_WRITE_CONCURRENCY", 8))
+SECTION_MAX_OUTPUT_TOKENS = int(os.getenv("SECTION_MAX_OUTPUT_TOKENS", 1024))
+ARTICLE_WORD_BUDGET = 1100
 
 # ================= UTILS =================
-def load_json(path):
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"❌ File not found: {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def load_research(run_id=None):
+    data = json.loads(read_artifact(RESEARCH_FILE, run_id))
     return data[0] if isinstance(data, list) else data
 
-def call_gemini(prompt):
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-flash",
-        system_instruction="""
+WRITER_SYSTEM_ROLE = """
 You are a professional SEO content writer.
 
 STRICT RULES:
@@ -54,29 +46,23 @@ CONTENT STYLE:
 - Structured
 - Easy to scan
 """
-    )
 
-    res = model.generate_content(
-        prompt,
-        generation_config={
-            "temperature": 0.35,
-            "max_output_tokens": 4096
-        }
+async def call_gemini(prompt):
+    return await llm_client.call_gemini(
+        prompt=prompt,
+        system_role=WRITER_SYSTEM_ROLE,
+        temperature=0.35,
+        max_output_tokens=4096,
     )
-    return res.text.strip()
-
-# ================= MAIN WRITING AGENT =================
-def run():
-    print("\n🚀 Writing Agent Started (STRICT STRUCTURE MODE)\n")
-
-    research = load_json(RESEARCH_JSON_PATH)
 
+# ================= PROMPTS =================
+def build_article_prompt(research):
     topic = research.get("primary_keyword", "Topic")
     content_angle = research.get("content_angle", "")
     questions = research.get("question_keywords", [])
     secondary = research.get("secondary_keywords", [])
 
-    prompt = f"""
+    return f"""
 Analyze the following research data and write a FULL article.
 
 RESEARCH DATA:
@@ -103,18 +89,264 @@ FINAL RULES:
 - DO NOT explain theory
 """
 
-    article = call_gemini(prompt)
+def build_brief_prompt(brief):
+    if isinstance(brief, str):
+        brief = json.loads(brief)
+
+    return f"""
+You are an expert content writer.
+
+Generate a comprehensive blog article based on the following research brief:
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    output_path = os.path.join(OUTPUT_DIR, "article.md")
+{json.dumps(brief, indent=2)}
 
+Write a complete, SEO-optimized article with:
+1. Engaging introduction
+2. Detailed sections based on the structure provided
+3. Keyword optimization
+4. Compelling conclusion with CTA
+
+Return the article content."""
+
+# ================= STREAMING =================
+# Streams the article chunk by chunk and appends each chunk to the output
+# file as it arrives, so readers see progress within about a second.
+# The incremental file lives in the run's own workspace. Once the stream
+# completes, the full article is written through the workspace: an atomic
+# rewrite that also indexes the artifact and publishes the "latest" copy.
+async def stream_article(
+    prompt,
+    system_role=WRITER_SYSTEM_ROLE,
+    temperature=0.35,
+    workspace=None,
+    **generation_config
+):
+    workspace = workspace or Workspace()
+    output_path = workspace.path(ARTICLE_FILE)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    parts = []
     with open(output_path, "w", encoding="utf-8") as f:
-        f.write(article)
+        async for chunk in llm_client.stream_gemini(
+            prompt=prompt,
+            system_role=system_role,
+            temperature=temperature,
+            **generation_config
+        ):
+            f.write(chunk)
+            f.flush()
+            parts.append(chunk)
+            yield chunk
+
+    await workspace.write_text_async(ARTICLE_FILE, "".join(parts))
+
+def stream_article_from_brief(brief, workspace=None):
+    return stream_article(
+        build_brief_prompt(brief),
+        system_role="Expert content writer",
+        temperature=0.7,
+        workspace=workspace
+    )
+
+# ================= API MODE =================
+async def write_article_from_brief(brief, workspace=None):
+    article = await llm_client.call_gemini(
+        prompt=build_brief_prompt(brief),
+        system_role="Expert content writer",
+        temperature=0.7
+    )
+    if workspace:
+        await workspace.write_text_async(ARTICLE_FILE, article)
+    return article
+
+# ================= SECTIONED GENERATION =================
+# The brief's question_keywords are the outline: intro, one section per
+# question, conclusion. Every section is its own LLM call under the same
+# style preamble (sent as the system instruction, so all calls share one
+# model instance), written concurrently and assembled in outline order.
+# Latency is bounded by the slowest section, and each call is short enough
+# that it is never truncated by the output cap.
+SECTION_SYSTEM_ROLE = """
+You are a professional SEO content writer writing ONE section of a longer article.
+
+STRICT RULES:
+- Follow ONLY the provided research data
+- Write ONLY the requested section; other sections are written separately
+- DO NOT repeat what belongs to other sections of the outline
+- DO NOT introduce unrelated topics
+- DO NOT explain theory
+
+FORMAT RULES (MANDATORY):
+- MAIN HEADINGS → ALL CAPS + **BOLD**
+- SUBHEADINGS → **BOLD**
+- CONTENT → BULLET POINTS ONLY
+- NO LONG PARAGRAPHS
+- NO FILLER
+"""
+
+def build_outline(research):
+    if isinstance(research, str):
+        research = json.loads(research)
+
+    questions = [q for q in research.get("question_keywords", []) if q]
+    outline = [{"id": "intro", "kind": "intro", "title": "Introduction"}]
+    outline += [
+        {"id": f"q{i + 1}", "kind": "question", "title": q}
+        for i, q in enumerate(questions)
+    ]
+    outline.append({"id": "conclusion", "kind": "conclusion", "title": "Conclusion"})
+
+    words = max(ARTICLE_WORD_BUDGET // len(outline), 80)
+    for section in outline:
+        section["words"] = words
+    return outline
+
+def build_style_preamble(research):
+    return f"""{SECTION_SYSTEM_ROLE}
+ARTICLE CONTEXT (shared by every section):
+Topic focus: {research.get("primary_keyword", "Topic")}
+
+Content intent:
+{research.get("content_angle", "")}
+
+Related concepts (use naturally, no stuffing):
+{research.get("secondary_keywords", [])}
+
+Writing instructions:
+{research.get("writing_instructions", "")}
+"""
+
+def build_section_prompt(section, outline):
+    plan = "\n".join(
+        f"{'→' if s['id'] == section['id'] else '-'} {s['title']}" for s in outline
+    )
+    task = {
+        "intro": "Write the INTRODUCTION: hook the reader and preview what the article covers. Do NOT answer the questions yet.",
+        "question": f"Write the section answering: {section['title']}",
+        "conclusion": "Write the CONCLUSION: summarise the key takeaways. Do NOT introduce new points.",
+    }[section["kind"]]
+
+    return f"""
+ARTICLE OUTLINE (→ marks your section):
+{plan}
+
+TASK:
+{task}
+
+- Start with the section heading (bold, capitalized)
+- Around {section["words"]} words
+- Return ONLY the section markdown
+"""
+
+async def write_section(section, outline, preamble, temperature=0.35):
+    text = await llm_client.call_gemini(
+        prompt=build_section_prompt(section, outline),
+        system_role=preamble,
+        temperature=temperature,
+        max_output_tokens=SECTION_MAX_OUTPUT_TOKENS,
+    )
+    return {**section, "text": text}
+
+def assemble_sections(sections):
+    return "\n\n".join(s["text"].strip() for s in sections if s.get("text")) + "\n"
+
+async def write_article_sections(research, workspace=None, on_section=None):
+    if isinstance(research, str):
+        research = json.loads(research)
+
+    outline = build_outline(research)
+    preamble = build_style_preamble(research)
+    semaphore = asyncio.Semaphore(SECTION_WRITE_CONCURRENCY)
+
+    async def write(section):
+        async with semaphore:
+            result = await write_section(section, outline, preamble)
+        if on_section:
+            await on_section(result)
+        return result
+
+    sections = await asyncio.gather(*(write(s) for s in outline))
+    article = assemble_sections(sections)
+
+    if workspace:
+        await workspace.write_json_async(SECTIONS_FILE, {"research": research, "sections": sections})
+        await workspace.write_text_async(ARTICLE_FILE, article)
+    return article, sections
+
+# Rewrites one section of a sectioned run and reassembles the article; the
+# other sections are reused untouched.
+async def regenerate_section(workspace, section_id, temperature=0.5):
+    saved = workspace.read_json(SECTIONS_FILE)
+    research, sections = saved["research"], saved["sections"]
+
+    index = next((i for i, s in enumerate(sections) if s["id"] == section_id), None)
+    if index is None:
+        raise ValueError(f"❌ Unknown section: {section_id}")
+
+    outline = [{k: v for k, v in s.items() if k != "text"} for s in sections]
+    sections[index] = await write_section(
+        outline[index], outline, build_style_preamble(research), temperature
+    )
+
+    article = assemble_sections(sections)
+    await workspace.write_json_async(SECTIONS_FILE, {"research": research, "sections": sections})
+    await workspace.write_text_async(ARTICLE_FILE, article)
+    return article, sections[index]
+
+# Strict-structure article from a research brief held in memory (the
+# CLI and pipeline path); sections=True uses the sectioned writer.
+async def write_article(research, workspace=None, sections=False, on_section=None):
+    if sections:
+        article, _ = await write_article_sections(research, workspace, on_section)
+        return article
+
+    article = await call_gemini(build_article_prompt(research))
+    if workspace:
+        await workspace.write_text_async(ARTICLE_FILE, article)
+    return article
+
+# ================= MAIN WRITING AGENT =================
+async def run_async(stream=False, run_id=None, sections=False, section_id=None):
+    print("\n🚀 Writing Agent Started (STRICT STRUCTURE MODE)\n")
+
+    workspace = Workspace(run_id)
+
+    if section_id:
+        _, section = await regenerate_section(workspace, section_id)
+        print(f"🔁 Regenerated section: {section['title']}")
+        print(f"📄 Saved to → {workspace.path(ARTICLE_FILE)} (run {workspace.run_id})")
+        return
+
+    research = load_research(run_id)
+    prompt = build_article_prompt(research)
+
+    if sections:
+        async def on_section(section):
+            print(f"   ✍️ {section['id']}: {section['title']}")
+
+        _, written = await write_article_sections(research, workspace, on_section)
+        print(f"🧩 Assembled {len(written)} sections")
+    elif stream:
+        async for chunk in stream_article(prompt, workspace=workspace, max_output_tokens=4096):
+            print(chunk, end="", flush=True)
+        print()
+    else:
+        await write_article(research, workspace)
 
     print("✅ Article generated successfully")
-    print(f"📄 Saved to → {output_path}")
+    print(f"📄 Saved to → {workspace.path(ARTICLE_FILE)} (run {workspace.run_id})")
+
+def run(stream=False, run_id=None, sections=False, section_id=None):
+    asyncio.run(run_async(stream, run_id, sections, section_id))
 
 # ================= ENTRY =================
 if __name__ == "__main__":
-    run()
-
+    import sys
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    section_id = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--section=")), None)
+    run(
+        stream="--stream" in sys.argv,
+        run_id=args[0] if args else None,
+        sections="--sections" in sys.argv,
+        section_id=section_id,
+    )